@@ -111,10 +111,10 @@ class AdvancedDeduplicator:
         domain_groups = {}
         
         for detection in detections:
-            domain = detection.phishing_domain.lower().strip()
-            if domain not in domain_groups:
-                domain_groups[domain] = []
-            domain_groups[domain].append(detection)
+            # phishing_domain_norm is only filled once init_db() has applied the
+            # schema upgrades; without the fallback every row would group under None
+            domain_key = detection.phishing_domain_norm or (detection.phishing_domain or '').lower().strip()
+            domain_groups.setdefault(domain_key, []).append(detection)
         
         # Return groups with more than one detection
         return [group for group in domain_groups.values() if len(group) > 1]
@@ -404,7 +404,9 @@ class AdvancedDeduplicator:
         inactive_detections = total_detections - active_detections
         
         # Get unique domains
-        unique_domains = self.db.query(PhishingDetection.phishing_domain).filter(
+        unique_domains = self.db.query(
+            func.coalesce(PhishingDetection.phishing_domain_norm, func.lower(func.btrim(PhishingDetection.phishing_domain)))
+        ).filter(
             PhishingDetection.is_active == True
         ).distinct().count()
         
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from backend.config import settings
@@ -8,14 +9,54 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _install_server_timeouts(engine):
+    """
+    Apply the configured statement/idle-in-transaction timeouts to every
+    transaction, so a stuck statement or transaction cannot pin a backend.
+    SET LOCAL ends with the transaction, which keeps it correct behind
+    PgBouncer transaction pooling, where session-level settings would leak
+    to other clients.
+    """
+    timeouts = {
+        'statement_timeout': settings.DB_STATEMENT_TIMEOUT_MS,
+        'idle_in_transaction_session_timeout': settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS,
+    }
+    statements = [f"SET LOCAL {name} = {int(ms)}" for name, ms in timeouts.items() if ms > 0]
+    if engine.dialect.name != "postgresql" or not statements:
+        return
+    
+    @event.listens_for(engine, "begin")
+    def _set_transaction_timeouts(conn):
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
 # Create engine with connection pooling and error handling
 try:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        echo=settings.DEBUG
-    )
+    engine_options = {
+        'echo': settings.DEBUG,
+        # Compiled-SQL cache shared by every session on this engine; the
+        # default 500 entries churns with the API, worker and monitor
+        # statements all compiled in one process
+        'query_cache_size': 1200,
+    }
+    if settings.PGBOUNCER_ENABLED:
+        # PgBouncer multiplexes server connections; a second pool here would
+        # only pin them, so open/close per checkout instead
+        engine = create_engine(
+            settings.DATABASE_URL,
+            poolclass=NullPool,
+            **engine_options
+        )
+    else:
+        engine = create_engine(
+            settings.DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            **engine_options
+        )
+    _install_server_timeouts(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base = declarative_base()
     logger.info("Database engine created successfully")
@@ -37,10 +78,80 @@ def get_db():
         db.close()
 
 
+# Idempotent PostgreSQL DDL applied on top of create_all (which never alters
+# existing tables). Keeps phishing_domain_norm = lower(btrim(phishing_domain))
+# so dedup and stats can group on an indexed column instead of normalizing
+# every row in Python.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE phishing_detections ADD COLUMN IF NOT EXISTS phishing_domain_norm VARCHAR",
+    """
+    CREATE OR REPLACE FUNCTION phishing_detections_set_domain_norm() RETURNS trigger AS $$
+    BEGIN
+        NEW.phishing_domain_norm := lower(btrim(NEW.phishing_domain));
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_phishing_detections_domain_norm ON phishing_detections",
+    """
+    CREATE TRIGGER trg_phishing_detections_domain_norm
+    BEFORE INSERT OR UPDATE OF phishing_domain ON phishing_detections
+    FOR EACH ROW EXECUTE FUNCTION phishing_detections_set_domain_norm()
+    """,
+    """
+    UPDATE phishing_detections SET phishing_domain_norm = lower(btrim(phishing_domain))
+    WHERE phishing_domain_norm IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_pd_norm ON phishing_detections (phishing_domain_norm)
+    WHERE is_active
+    """,
+    # Set once a CSE domain's variations have been generated
+    "ALTER TABLE cse_domains ADD COLUMN IF NOT EXISTS variations_generated_at TIMESTAMP",
+    # At most one active schedule per domain, so schedule creation can rely on
+    # INSERT ... ON CONFLICT DO NOTHING; older active duplicates are retired first
+    """
+    UPDATE monitoring_schedules m SET is_active = false
+    WHERE m.is_active AND EXISTS (
+        SELECT 1 FROM monitoring_schedules o
+        WHERE o.domain = m.domain AND o.is_active AND o.id > m.id
+    )
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_monitoring_schedules_active_domain
+    ON monitoring_schedules (domain) WHERE is_active
+    """,
+    # Active schedules by due/expiry time: serves the monitoring cycle's due
+    # query and the active-only statistics counters without touching history
+    """
+    CREATE INDEX IF NOT EXISTS idx_ms_active
+    ON monitoring_schedules (next_check, end_date) WHERE is_active
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_ms_risk
+    ON monitoring_schedules (risk_level) INCLUDE (domain)
+    """,
+]
+
+
+def apply_schema_upgrades():
+    """Apply idempotent schema upgrades (PostgreSQL only)"""
+    if engine.dialect.name != "postgresql":
+        return
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        # Backfills can outlast the per-statement timeout on large tables
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+    logger.info("Database schema upgrades applied")
+
+
 def init_db():
     """Initialize database tables with error handling"""
     try:
         Base.metadata.create_all(bind=engine)
+        apply_schema_upgrades()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Failed to create database tables: {e}")
@@ -8,12 +8,18 @@ from bs4 import BeautifulSoup
 import requests
 from typing import Dict, Any, Optional, Tuple
 import os
+import threading
 from datetime import datetime
+from cachetools import TTLCache
 from backend.config import settings
 from .ml_detector import MLPhishingDetector
 from .nlp_analyzer import NLPContentAnalyzer
 from .ensemble_detector import EnsemblePhishingDetector
 
+# How long a captured screenshot is reused before the site is captured again
+SCREENSHOT_REUSE_SECONDS = 3600
+SCREENSHOT_CACHE_SIZE = 512
+
 
 class PhishingDetector:
     """Detect phishing sites using visual and content analysis"""
@@ -26,11 +32,21 @@ class PhishingDetector:
         self.ml_detector = MLPhishingDetector()
         self.nlp_analyzer = NLPContentAnalyzer()
         self.ensemble_detector = EnsemblePhishingDetector()
+        
+        # domain -> screenshot path of a real capture (never a placeholder);
+        # shared across tasks and threads, so guarded by a lock
+        self._screenshot_lock = threading.Lock()
+        self._screenshot_cache = TTLCache(maxsize=SCREENSHOT_CACHE_SIZE, ttl=SCREENSHOT_REUSE_SECONDS)
     
-    def analyze_domain(self, legitimate_domain: str, suspicious_domain: str) -> Dict[str, Any]:
+    def analyze_domain(self, legitimate_domain: str, suspicious_domain: str,
+                       suspicious_screenshot: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze a suspicious domain against the legitimate one
         Returns detection results with scores
+        
+        A screenshot of the suspicious domain that was already captured can be
+        passed in to skip capturing it again. The legitimate domain's
+        screenshot is reused across calls for SCREENSHOT_REUSE_SECONDS.
         """
         result = {
             'suspicious_domain': suspicious_domain,
@@ -51,8 +67,8 @@ class PhishingDetector:
         
         try:
             # Capture screenshots
-            susp_screenshot = self._capture_screenshot(suspicious_domain)
-            legit_screenshot = self._capture_screenshot(legitimate_domain)
+            susp_screenshot = suspicious_screenshot or self._capture_screenshot(suspicious_domain)
+            legit_screenshot = self.screenshot_once(legitimate_domain)
             
             if susp_screenshot and legit_screenshot:
                 result['screenshot_path'] = susp_screenshot
@@ -171,8 +187,27 @@ class PhishingDetector:
                 'model_weights': {}
             }
     
+    def screenshot_once(self, domain: str) -> Optional[str]:
+        """Screenshot a domain, reusing a recent real capture of it if one exists"""
+        with self._screenshot_lock:
+            path = self._screenshot_cache.get(domain)
+        if path and os.path.exists(path):
+            return path
+        
+        path, is_placeholder = self._capture(domain)
+        # A placeholder means the capture failed; retry on the next call
+        if path and not is_placeholder:
+            with self._screenshot_lock:
+                self._screenshot_cache[domain] = path
+        return path
+    
     def _capture_screenshot(self, domain: str, timeout: int = 30000) -> Optional[str]:
         """Capture screenshot of a domain using Playwright with fallback"""
+        return self._capture(domain, timeout)[0]
+    
+    def _capture(self, domain: str, timeout: int = 30000) -> Tuple[Optional[str], bool]:
+        """Capture a screenshot; returns (path, True if it is a placeholder)"""
+        filepath = None
         try:
             # Ensure domain has protocol
             if not domain.startswith('http'):
@@ -202,25 +237,25 @@ class PhishingDetector:
                     try:
                         page.goto(url, wait_until='networkidle', timeout=timeout)
                         page.screenshot(path=filepath, full_page=True)
-                        return filepath
+                        return filepath, False
                     except Exception as e:
                         # Try http if https fails
                         if url.startswith('https://'):
                             url = url.replace('https://', 'http://')
                             page.goto(url, wait_until='networkidle', timeout=timeout)
                             page.screenshot(path=filepath, full_page=True)
-                            return filepath
+                            return filepath, False
                         raise e
                     finally:
                         browser.close()
             except Exception as playwright_error:
                 print(f"Playwright failed for {domain}: {playwright_error}")
                 # Fallback: Create a placeholder screenshot
-                return self._create_placeholder_screenshot(domain, filepath)
+                return self._create_placeholder_screenshot(domain, filepath), True
                     
         except Exception as e:
             print(f"Screenshot capture failed for {domain}: {e}")
-            return self._create_placeholder_screenshot(domain, filepath)
+            return self._create_placeholder_screenshot(domain, filepath), True
     
     def _create_placeholder_screenshot(self, domain: str, filepath: str) -> str:
         """Create a placeholder screenshot when Playwright fails"""
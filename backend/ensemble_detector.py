@@ -3,13 +3,16 @@ Advanced Ensemble Methods for Phishing Detection
 Combines multiple ML models and techniques for superior accuracy
 """
 
+import os
 import numpy as np
 import logging
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime
 import warnings
 from pathlib import Path
 
+from . import feature_kernels as fk
+
 try:
     import joblib
     JOBLIB_AVAILABLE = True
@@ -47,14 +50,59 @@ try:
 except ImportError:
     LIGHTGBM_AVAILABLE = False
 
+try:
+    import numexpr as ne
+    # Respect an explicit limit, e.g. the one joblib sets inside its workers
+    if 'NUMEXPR_NUM_THREADS' not in os.environ:
+        ne.set_num_threads(os.cpu_count() or 1)
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Rows per histogram block when computing entropies in batch
+ENTROPY_BATCH_ROWS = 4096
+
 class EnsemblePhishingDetector:
     """
     Advanced ensemble detector combining multiple ML models
     for superior phishing detection accuracy
     """
     
+    # Column order of the feature matrix, matching the key order of
+    # _extract_advanced_features
+    FEATURE_NAMES: Tuple[str, ...] = (
+        # Domain features
+        'domain_length', 'subdomain_count', 'has_hyphen', 'has_number',
+        'has_mixed_case', 'tld_length', 'digit_count', 'vowel_ratio',
+        'consonant_ratio', 'special_char_count', 'domain_entropy',
+        'legitimate_domain_similarity', 'has_ip_address', 'has_shortening_service',
+        'has_uncommon_tld', 'has_at_symbol', 'has_double_slash', 'port_present',
+        'punycode_present', 'brand_keyword_in_domain', 'suspicious_tld',
+        'domain_age_indicators', 'typosquatting_score',
+        # Content features
+        'content_length', 'phishing_keyword_count', 'brand_keyword_count',
+        'suspicious_pattern_count', 'has_forms', 'has_links', 'has_images',
+        'has_scripts', 'has_iframes', 'exclamation_count', 'question_count',
+        'uppercase_ratio', 'digit_ratio', 'special_char_ratio',
+        # URL features
+        'url_length', 'path_depth', 'query_params_count', 'has_https', 'has_http',
+        'has_www', 'has_redirect', 'has_encoded_chars', 'has_unicode',
+        # Statistical features (domain_entropy is shared with the domain block)
+        'content_entropy', 'domain_variance', 'content_variance', 'domain_std',
+        'content_std', 'domain_mean', 'content_mean',
+        # Security features
+        'has_ssl_indicators', 'has_certificate_indicators', 'has_trust_indicators',
+        'has_privacy_indicators', 'has_contact_info', 'has_legitimate_indicators'
+    )
+    NUM_FEATURES = len(FEATURE_NAMES)
+    
+    # Bump whenever feature values change without the names changing
+    # (_extract_domain_features, feature_kernels, keyword lists, typosquatting
+    # scoring); cached training vectors are keyed on it
+    FEATURE_EXTRACTOR_VERSION = 1
+    
     def __init__(self):
         self.models = {}
         self.ensemble_model = None
@@ -225,12 +273,26 @@ class EnsemblePhishingDetector:
             logger.warning(f"Model load failed: {e}")
             return False
     
-    def _extract_advanced_features(self, domain: str, content: str, legitimate_domain: str) -> Dict[str, Any]:
-        """Extract comprehensive features for ensemble models"""
+    def _extract_advanced_features(self, domain: str, content: str, legitimate_domain: str,
+                                   content_entropy: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Extract comprehensive features for ensemble models as a
+        (NUM_FEATURES,) float32 vector ordered by FEATURE_NAMES.
+        Returns None when the domain is missing or not a string.
+        A precomputed content_entropy skips that calculation.
+        """
+        if not domain or not isinstance(domain, str):
+            return None
+        if not isinstance(content, str):
+            content = ''
+        if not isinstance(legitimate_domain, str):
+            legitimate_domain = ''
+        
         features = {}
+        stats = self._domain_numeric_stats(domain)
         
         # Domain-based features
-        features.update(self._extract_domain_features(domain, legitimate_domain))
+        features.update(self._extract_domain_features(domain, legitimate_domain, stats))
         
         # Content-based features
         features.update(self._extract_content_features(content))
@@ -239,27 +301,82 @@ class EnsemblePhishingDetector:
         features.update(self._extract_url_features(domain, content))
         
         # Statistical features
-        features.update(self._extract_statistical_features(domain, content))
+        features.update(self._extract_statistical_features(domain, content, stats, content_entropy))
         
         # Security features
         features.update(self._extract_security_features(domain, content))
         
-        return features
+        return np.fromiter(features.values(), dtype=np.float32, count=self.NUM_FEATURES)
+    
+    def _extract_advanced_features_batch(self, domains: List[str], contents: List[str], legitimate_domains: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extract features for many samples into a dense (N, NUM_FEATURES) float32
+        matrix ordered by FEATURE_NAMES. Also returns a boolean mask of the rows
+        that extracted successfully; failed rows are left unfilled.
+        """
+        n_samples = len(domains)
+        out = np.empty((n_samples, self.NUM_FEATURES), dtype=np.float32)
+        valid = np.zeros(n_samples, dtype=bool)
+        extract = self._extract_advanced_features
+        contents = [content if isinstance(content, str) else '' for content in contents]
+        content_entropies = self._batch_entropy(contents)
+        
+        i = 0
+        try:
+            for i in range(n_samples):
+                vec = extract(domains[i], contents[i], legitimate_domains[i], content_entropies[i])
+                if vec is None:
+                    continue
+                out[i] = vec
+                valid[i] = True
+        except Exception as e:
+            # Unexpected; keep the rows extracted so far
+            logger.error(f"Feature extraction aborted at domain {domains[i]}: {e}")
+        
+        return out, valid
+    
+    def _domain_numeric_stats(self, domain: str) -> np.ndarray:
+        """Compute the numeric domain statistics laid out as in feature_kernels"""
+        stats = np.empty(fk.NUM_DOMAIN_STATS, dtype=np.float64)
+        
+        if domain.isascii():
+            fk.domain_numeric_features(np.frombuffer(domain.encode('ascii'), dtype=np.uint8), stats)
+            return stats
+        
+        # Non-ASCII domains keep Python's unicode-aware character classes
+        codes = [ord(c) for c in domain]
+        stats[fk.DOMAIN_LENGTH] = len(domain)
+        stats[fk.DOT_COUNT] = domain.count('.')
+        stats[fk.HYPHEN_COUNT] = domain.count('-')
+        stats[fk.DIGIT_COUNT] = sum(c.isdigit() for c in domain)
+        stats[fk.VOWEL_RATIO] = sum(1 for c in domain if c in 'aeiou') / len(domain)
+        stats[fk.CONSONANT_RATIO] = sum(1 for c in domain if c.isalpha() and c not in 'aeiou') / len(domain)
+        stats[fk.SPECIAL_CHAR_COUNT] = sum(1 for c in domain if not c.isalnum() and c != '.')
+        stats[fk.ENTROPY] = self._calculate_entropy(domain)
+        stats[fk.BYTE_MEAN] = np.mean(codes)
+        stats[fk.BYTE_VARIANCE] = np.var(codes)
+        stats[fk.BYTE_STD] = np.std(codes)
+        stats[fk.LOWER_COUNT] = sum(c.islower() for c in domain)
+        stats[fk.UPPER_COUNT] = sum(c.isupper() for c in domain)
+        return stats
     
-    def _extract_domain_features(self, domain: str, legitimate_domain: str) -> Dict[str, Any]:
+    def _extract_domain_features(self, domain: str, legitimate_domain: str, stats: np.ndarray = None) -> Dict[str, Any]:
         """Extract domain-specific features"""
+        if stats is None:
+            stats = self._domain_numeric_stats(domain)
+        
         return {
-            'domain_length': len(domain),
-            'subdomain_count': domain.count('.'),
-            'has_hyphen': 1 if '-' in domain else 0,
-            'has_number': 1 if any(char.isdigit() for char in domain) else 0,
-            'has_mixed_case': 1 if any(c.islower() for c in domain) and any(c.isupper() for c in domain) else 0,
+            'domain_length': int(stats[fk.DOMAIN_LENGTH]),
+            'subdomain_count': int(stats[fk.DOT_COUNT]),
+            'has_hyphen': 1 if stats[fk.HYPHEN_COUNT] else 0,
+            'has_number': 1 if stats[fk.DIGIT_COUNT] else 0,
+            'has_mixed_case': 1 if stats[fk.LOWER_COUNT] and stats[fk.UPPER_COUNT] else 0,
             'tld_length': len(domain.split('.')[-1]) if '.' in domain else 0,
-            'digit_count': sum(c.isdigit() for c in domain),
-            'vowel_ratio': sum(1 for c in domain if c in 'aeiou') / len(domain) if len(domain) > 0 else 0,
-            'consonant_ratio': sum(1 for c in domain if c.isalpha() and c not in 'aeiou') / len(domain) if len(domain) > 0 else 0,
-            'special_char_count': sum(1 for c in domain if not c.isalnum() and c != '.'),
-            'domain_entropy': self._calculate_entropy(domain),
+            'digit_count': int(stats[fk.DIGIT_COUNT]),
+            'vowel_ratio': float(stats[fk.VOWEL_RATIO]),
+            'consonant_ratio': float(stats[fk.CONSONANT_RATIO]),
+            'special_char_count': int(stats[fk.SPECIAL_CHAR_COUNT]),
+            'domain_entropy': float(stats[fk.ENTROPY]),
             'legitimate_domain_similarity': self._calculate_string_similarity(domain, legitimate_domain),
             'has_ip_address': 1 if self._has_ip_address(domain) else 0,
             'has_shortening_service': 1 if any(s in domain for s in ['bit.ly', 'tinyurl.com', 'goo.gl', 't.co']) else 0,
@@ -332,16 +449,22 @@ class EnsemblePhishingDetector:
             'has_unicode': 1 if any(ord(c) > 127 for c in url) else 0
         }
     
-    def _extract_statistical_features(self, domain: str, content: str) -> Dict[str, Any]:
+    def _extract_statistical_features(self, domain: str, content: str, stats: np.ndarray = None,
+                                      content_entropy: Optional[float] = None) -> Dict[str, Any]:
         """Extract statistical features"""
+        if stats is None:
+            stats = self._domain_numeric_stats(domain)
+        if content_entropy is None:
+            content_entropy = self._calculate_entropy(content)
+        
         return {
-            'domain_entropy': self._calculate_entropy(domain),
-            'content_entropy': self._calculate_entropy(content),
-            'domain_variance': np.var([ord(c) for c in domain]) if domain else 0,
+            'domain_entropy': float(stats[fk.ENTROPY]),
+            'content_entropy': float(content_entropy),
+            'domain_variance': float(stats[fk.BYTE_VARIANCE]),
             'content_variance': np.var([ord(c) for c in content]) if content else 0,
-            'domain_std': np.std([ord(c) for c in domain]) if domain else 0,
+            'domain_std': float(stats[fk.BYTE_STD]),
             'content_std': np.std([ord(c) for c in content]) if content else 0,
-            'domain_mean': np.mean([ord(c) for c in domain]) if domain else 0,
+            'domain_mean': float(stats[fk.BYTE_MEAN]),
             'content_mean': np.mean([ord(c) for c in content]) if content else 0
         }
     
@@ -364,6 +487,38 @@ class EnsemblePhishingDetector:
         entropy = -sum(p * np.log2(p) for p in probabilities if p > 0)
         return entropy
     
+    def _batch_entropy(self, strings: List[str]) -> np.ndarray:
+        """Calculate the Shannon entropy of many strings at once"""
+        result = np.zeros(len(strings), dtype=np.float64)
+        
+        ascii_rows = []
+        for i, s in enumerate(strings):
+            if not s:
+                continue
+            if s.isascii():
+                ascii_rows.append(i)
+            else:
+                result[i] = self._calculate_entropy(s)
+        
+        # ASCII strings are histogrammed together, one 256-bin row per string
+        for start in range(0, len(ascii_rows), ENTROPY_BATCH_ROWS):
+            rows = ascii_rows[start:start + ENTROPY_BATCH_ROWS]
+            encoded = [strings[i].encode('ascii') for i in rows]
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(rows))
+            codes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            owner = np.repeat(np.arange(len(rows)), lengths)
+            counts = np.bincount(owner * 256 + codes, minlength=len(rows) * 256).reshape(len(rows), 256)
+            probs = counts / lengths[:, None]
+            
+            if NUMEXPR_AVAILABLE:
+                plogp_sum = ne.evaluate('sum(where(probs > 0, probs * log(probs), 0.0), axis=1)')
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    plogp_sum = np.where(probs > 0, probs * np.log(probs), 0.0).sum(axis=1)
+            result[rows] = -plogp_sum / np.log(2)
+        
+        return result
+    
     def _calculate_string_similarity(self, s1: str, s2: str) -> float:
         """Calculate similarity between two strings"""
         if not s1 or not s2:
@@ -472,7 +627,9 @@ class EnsemblePhishingDetector:
         try:
             # Extract features
             features = self._extract_advanced_features(domain, content, legitimate_domain)
-            feature_vector = np.array(list(features.values())).reshape(1, -1)
+            if features is None:
+                return self._fallback_prediction(domain, content or '', legitimate_domain)
+            feature_vector = features.reshape(1, -1)
             
             # Scale features
             feature_vector_scaled = self.scaler.transform(feature_vector)
@@ -506,7 +663,7 @@ class EnsemblePhishingDetector:
                 'confidence': float(confidence),
                 'individual_predictions': individual_predictions,
                 'model_weights': self.model_weights,
-                'feature_importance': {name: float(value) for name, value in features.items()}
+                'feature_importance': {name: float(value) for name, value in zip(self.FEATURE_NAMES, features)}
             }
             
         except Exception as e:
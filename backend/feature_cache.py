@@ -0,0 +1,95 @@
+"""
+SQLite-backed cache of extracted feature vectors
+Lets repeated training runs skip feature extraction for unchanged samples
+"""
+
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 999
+
+
+def _hash_bytes(data: bytes) -> str:
+    """Fast non-cryptographic digest, falling back to blake2b"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64(data).hexdigest()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class FeatureCache:
+    """Persist float32 feature vectors keyed by a hash of the extractor inputs"""
+
+    def __init__(self, path: str, feature_names: Sequence[str], extractor_version: int = 0):
+        self.path = Path(path)
+        self.num_features = len(feature_names)
+        # Any change to the feature layout or extractor version invalidates
+        # every cached vector
+        self.feature_set = _hash_bytes(
+            f"v{extractor_version}\0".encode() + '\0'.join(feature_names).encode()
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS features_cache (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        row = self.conn.execute("SELECT value FROM cache_meta WHERE name = 'feature_set'").fetchone()
+        if row is None or row[0] != self.feature_set:
+            if row is not None:
+                logger.info("Feature layout or extractor version changed, clearing feature cache")
+            self.conn.execute("DELETE FROM features_cache")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('feature_set', ?)",
+                (self.feature_set,)
+            )
+        self.conn.commit()
+
+    @staticmethod
+    def key(domain: str, content: str, legitimate_domain: str) -> str:
+        """Cache key for one sample"""
+        return _hash_bytes(
+            (domain or '').encode() + b'\0' + (content or '').encode() + b'\0' + (legitimate_domain or '').encode()
+        )
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached vectors for the given keys"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), SQLITE_MAX_VARIABLES):
+            batch = unique_keys[i:i + SQLITE_MAX_VARIABLES]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, vec FROM features_cache WHERE key IN ({placeholders})", batch
+            )
+            for key, blob in rows:
+                vec = np.frombuffer(blob, dtype=np.float32)
+                if vec.shape[0] == self.num_features:
+                    found[key] = vec
+        return found
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]):
+        """Store computed vectors in a single transaction"""
+        if not items:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO features_cache (key, vec) VALUES (?, ?)",
+            [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
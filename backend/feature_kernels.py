@@ -0,0 +1,122 @@
+"""
+Compiled numeric kernels for domain feature extraction
+Operates on ASCII domains packed as uint8 buffers
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Output slots of domain_numeric_features
+DOMAIN_LENGTH = 0
+DOT_COUNT = 1
+HYPHEN_COUNT = 2
+DIGIT_COUNT = 3
+VOWEL_RATIO = 4
+CONSONANT_RATIO = 5
+SPECIAL_CHAR_COUNT = 6
+ENTROPY = 7
+BYTE_MEAN = 8
+BYTE_VARIANCE = 9
+BYTE_STD = 10
+LOWER_COUNT = 11
+UPPER_COUNT = 12
+NUM_DOMAIN_STATS = 13
+
+# Byte class lookup tables, matching str.isdigit/islower/isupper on ASCII
+_CODES = np.arange(256, dtype=np.float64)
+_IS_DIGIT = (_CODES >= 48) & (_CODES <= 57)
+_IS_LOWER = (_CODES >= 97) & (_CODES <= 122)
+_IS_UPPER = (_CODES >= 65) & (_CODES <= 90)
+_IS_VOWEL = np.isin(_CODES, [ord(c) for c in 'aeiou'])
+_IS_CONSONANT = (_IS_LOWER | _IS_UPPER) & ~_IS_VOWEL
+_IS_SPECIAL = ~(_IS_LOWER | _IS_UPPER | _IS_DIGIT) & (_CODES != ord('.'))
+
+
+def _domain_numeric_features_loop(buf, out):
+    """Single pass histogram kernel, compiled with numba when available"""
+    n = buf.shape[0]
+    for k in range(NUM_DOMAIN_STATS):
+        out[k] = 0.0
+    if n == 0:
+        return
+
+    hist = np.zeros(256, dtype=np.int64)
+    for i in range(n):
+        hist[buf[i]] += 1
+
+    total = 0.0
+    entropy = 0.0
+    for b in range(256):
+        count = hist[b]
+        if count == 0:
+            continue
+        if _IS_DIGIT[b]:
+            out[DIGIT_COUNT] += count
+        if _IS_VOWEL[b]:
+            out[VOWEL_RATIO] += count
+        if _IS_CONSONANT[b]:
+            out[CONSONANT_RATIO] += count
+        if _IS_SPECIAL[b]:
+            out[SPECIAL_CHAR_COUNT] += count
+        if _IS_LOWER[b]:
+            out[LOWER_COUNT] += count
+        if _IS_UPPER[b]:
+            out[UPPER_COUNT] += count
+        p = count / n
+        entropy -= p * np.log2(p)
+        total += b * count
+
+    mean = total / n
+    variance = 0.0
+    for b in range(256):
+        if hist[b]:
+            variance += hist[b] * (b - mean) ** 2
+    variance /= n
+
+    out[DOMAIN_LENGTH] = n
+    out[DOT_COUNT] = hist[46]
+    out[HYPHEN_COUNT] = hist[45]
+    out[VOWEL_RATIO] /= n
+    out[CONSONANT_RATIO] /= n
+    out[ENTROPY] = entropy
+    out[BYTE_MEAN] = mean
+    out[BYTE_VARIANCE] = variance
+    out[BYTE_STD] = np.sqrt(variance)
+
+
+def _domain_numeric_features_numpy(buf, out):
+    """Vectorized fallback when numba is not installed"""
+    out[:] = 0.0
+    n = buf.shape[0]
+    if n == 0:
+        return
+
+    hist = np.bincount(buf, minlength=256)
+    probabilities = hist[hist > 0] / n
+    mean = (hist * _CODES).sum() / n
+    variance = (hist * (_CODES - mean) ** 2).sum() / n
+
+    out[DOMAIN_LENGTH] = n
+    out[DOT_COUNT] = hist[46]
+    out[HYPHEN_COUNT] = hist[45]
+    out[DIGIT_COUNT] = hist[_IS_DIGIT].sum()
+    out[VOWEL_RATIO] = hist[_IS_VOWEL].sum() / n
+    out[CONSONANT_RATIO] = hist[_IS_CONSONANT].sum() / n
+    out[SPECIAL_CHAR_COUNT] = hist[_IS_SPECIAL].sum()
+    out[ENTROPY] = -(probabilities * np.log2(probabilities)).sum()
+    out[BYTE_MEAN] = mean
+    out[BYTE_VARIANCE] = variance
+    out[BYTE_STD] = np.sqrt(variance)
+    out[LOWER_COUNT] = hist[_IS_LOWER].sum()
+    out[UPPER_COUNT] = hist[_IS_UPPER].sum()
+
+
+if NUMBA_AVAILABLE:
+    domain_numeric_features = njit(cache=True)(_domain_numeric_features_loop)
+else:
+    domain_numeric_features = _domain_numeric_features_numpy
@@ -1,16 +1,29 @@
+import asyncio
 import dns.resolver
+import dns.asyncresolver
 import whois
 import requests
 import socket
 import ssl
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
+import threading
 from urllib.parse import urlparse
+from cachetools import TTLCache
 import warnings
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 from backend.config import settings
 
+# Concurrent DNS lookups in flight for bulk registration checks
+REGISTRATION_CONCURRENCY = 512
+
+# Result caches, so a domain re-analyzed across cycles or matched by several
+# CSE domains does not repeat the same network lookups
+INTEL_CACHE_SIZE = 10000
+INTEL_CACHE_TTL = 3600          # gather_all results and domain ages
+REGISTRATION_CACHE_TTL = 300    # DNS registration checks
+
 
 class IntelligenceGatherer:
     """Gather intelligence about domains without API keys"""
@@ -19,9 +32,25 @@ class IntelligenceGatherer:
         self.dns_resolver = dns.resolver.Resolver()
         self.dns_resolver.timeout = 5
         self.dns_resolver.lifetime = 5
+        
+        self._cache_lock = threading.Lock()
+        self._intel_cache = TTLCache(maxsize=INTEL_CACHE_SIZE, ttl=INTEL_CACHE_TTL)
+        self._age_cache = TTLCache(maxsize=INTEL_CACHE_SIZE, ttl=INTEL_CACHE_TTL)
+        self._registration_cache = TTLCache(maxsize=INTEL_CACHE_SIZE * 10, ttl=REGISTRATION_CACHE_TTL)
+    
+    def invalidate(self, domain: str):
+        """Drop cached results for a domain so the next lookup is fresh"""
+        with self._cache_lock:
+            self._intel_cache.pop(domain, None)
+            self._registration_cache.pop(domain, None)
     
     def gather_all(self, domain: str) -> Dict[str, Any]:
         """Gather all available intelligence for a domain"""
+        with self._cache_lock:
+            cached = self._intel_cache.get(domain)
+        if cached is not None:
+            return dict(cached)
+        
         result = {
             'domain': domain,
             'whois': self.get_whois_info(domain),
@@ -31,7 +60,9 @@ class IntelligenceGatherer:
             'blacklists': self.check_blacklists(domain),
             'cert_transparency': self.check_cert_transparency(domain)
         }
-        return result
+        with self._cache_lock:
+            self._intel_cache[domain] = result
+        return dict(result)
     
     def get_ps02_formatted_data(self, domain: str) -> Dict[str, Any]:
         """
@@ -755,6 +786,17 @@ class IntelligenceGatherer:
     
     def is_domain_registered(self, domain: str) -> bool:
         """Quick check if domain is registered"""
+        with self._cache_lock:
+            cached = self._registration_cache.get(domain)
+        if cached is not None:
+            return cached
+        
+        registered = self._resolve_registration(domain)
+        with self._cache_lock:
+            self._registration_cache[domain] = registered
+        return registered
+    
+    def _resolve_registration(self, domain: str) -> bool:
         try:
             # Try to resolve A record
             self.dns_resolver.resolve(domain, 'A')
@@ -772,6 +814,49 @@ class IntelligenceGatherer:
                 except:
                     return False
     
+    def are_domains_registered(self, domains: List[str]) -> Dict[str, bool]:
+        """
+        Check registration of many domains at once, with the same A/AAAA/MX
+        fallback as is_domain_registered but overlapping the DNS round-trips.
+        Must be called from synchronous code.
+        """
+        if not domains:
+            return {}
+        
+        results = {}
+        with self._cache_lock:
+            for domain in domains:
+                cached = self._registration_cache.get(domain)
+                if cached is not None:
+                    results[domain] = cached
+        pending = [domain for domain in domains if domain not in results]
+        if pending:
+            resolved = asyncio.run(self._are_domains_registered_async(pending))
+            with self._cache_lock:
+                for domain, registered in resolved.items():
+                    self._registration_cache[domain] = registered
+            results.update(resolved)
+        return results
+    
+    async def _are_domains_registered_async(self, domains: List[str]) -> Dict[str, bool]:
+        resolver = dns.asyncresolver.Resolver()
+        resolver.timeout = self.dns_resolver.timeout
+        resolver.lifetime = self.dns_resolver.lifetime
+        semaphore = asyncio.Semaphore(REGISTRATION_CONCURRENCY)
+        
+        async def check(domain: str) -> bool:
+            async with semaphore:
+                for record_type in ('A', 'AAAA', 'MX'):
+                    try:
+                        await resolver.resolve(domain, record_type)
+                        return True
+                    except Exception:
+                        continue
+                return False
+        
+        results = await asyncio.gather(*(check(domain) for domain in domains))
+        return dict(zip(domains, results))
+    
     def _calculate_similarity(self, str1: str, str2: str) -> float:
         """
         Calculate similarity between two strings using Levenshtein distance
@@ -852,24 +937,41 @@ class IntelligenceGatherer:
     
     def get_domain_age_days(self, whois_info: Dict[str, Any]) -> Optional[int]:
         """Calculate domain age in days from WHOIS info"""
+        creation_date_str = whois_info.get('creation_date') if isinstance(whois_info, dict) else None
+        if not creation_date_str:
+            return None
+        
+        # Only the creation date matters, so key the cache on it alone
+        key = tuple(creation_date_str) if isinstance(creation_date_str, list) else creation_date_str
         try:
-            if 'creation_date' in whois_info and whois_info['creation_date']:
-                creation_date_str = whois_info['creation_date']
-                
-                # Handle list of dates (some WHOIS returns lists)
-                if isinstance(creation_date_str, list):
-                    creation_date_str = creation_date_str[0]
-                
-                # Parse date
-                if isinstance(creation_date_str, str):
-                    # Try common date formats
-                    for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d-%m-%Y']:
-                        try:
-                            creation_date = datetime.strptime(creation_date_str.split('.')[0], fmt)
-                            age = (datetime.now() - creation_date).days
-                            return age
-                        except:
-                            continue
+            with self._cache_lock:
+                if key in self._age_cache:
+                    return self._age_cache[key]
+        except TypeError:
+            key = None
+        
+        age = self._compute_domain_age_days(creation_date_str)
+        if key is not None:
+            with self._cache_lock:
+                self._age_cache[key] = age
+        return age
+    
+    def _compute_domain_age_days(self, creation_date_str: Any) -> Optional[int]:
+        try:
+            # Handle list of dates (some WHOIS returns lists)
+            if isinstance(creation_date_str, list):
+                creation_date_str = creation_date_str[0]
+            
+            # Parse date
+            if isinstance(creation_date_str, str):
+                # Try common date formats
+                for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d-%m-%Y']:
+                    try:
+                        creation_date = datetime.strptime(creation_date_str.split('.')[0], fmt)
+                        age = (datetime.now() - creation_date).days
+                        return age
+                    except:
+                        continue
         except:
             pass
         return None
@@ -27,7 +27,7 @@ class MaliciousDatasetLoader:
     def __init__(self):
         self.ensemble_detector = EnsemblePhishingDetector()
         self.processed_domains = []
-        self.feature_names = []
+        self.feature_names = list(EnsemblePhishingDetector.FEATURE_NAMES)
         
     def load_dataset_file(self, file_path: str, dataset_type: str = "malicious") -> List[Dict[str, Any]]:
         """Load dataset from various file formats"""
@@ -243,8 +243,10 @@ class MaliciousDatasetLoader:
     
     def _generate_features(self, domains: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
         """Generate features for all domains"""
-        X = []
-        y = []
+        # Rows are written in place; k counts the ones that extracted
+        X = np.empty((len(domains), EnsemblePhishingDetector.NUM_FEATURES), dtype=np.float32)
+        y = np.empty(len(domains), dtype=np.int8)
+        k = 0
         
         logger.info("Generating features for domains...")
         
@@ -252,27 +254,21 @@ class MaliciousDatasetLoader:
             if i % 1000 == 0:
                 logger.info(f"Processing domain {i}/{len(domains)}")
             
-            try:
-                # Extract features
-                features = self.ensemble_detector._extract_advanced_features(
-                    domain_data['domain'],
-                    domain_data['content'],
-                    domain_data['legitimate_domain']
-                )
-                
-                if not self.feature_names:
-                    self.feature_names = list(features.keys())
-                
-                feature_vector = [features.get(name, 0.0) for name in self.feature_names]
-                X.append(feature_vector)
-                y.append(domain_data['label'])
-                
-            except Exception as e:
-                logger.warning(f"Error processing domain {domain_data['domain']}: {e}")
+            # Extract features
+            features = self.ensemble_detector._extract_advanced_features(
+                domain_data['domain'],
+                domain_data['content'],
+                domain_data['legitimate_domain']
+            )
+            if features is None:
                 continue
+            
+            X[k] = features
+            y[k] = domain_data['label']
+            k += 1
         
-        X = np.array(X)
-        y = np.array(y)
+        X = X[:k]
+        y = y[:k]
         
         logger.info(f"Generated features: {X.shape[0]} samples, {X.shape[1]} features")
         return X, y
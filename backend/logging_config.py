@@ -3,6 +3,7 @@ Comprehensive logging configuration for Phishing Detection System
 Logs all monitoring activities, scans, detections, and errors
 """
 
+import json
 import logging
 import os
 from datetime import datetime
@@ -43,6 +44,33 @@ class DetailedFormatter(logging.Formatter):
         return super().format(record)
 
 
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'timestamp', 'prefix'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields as top-level keys"""
+    
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# LOG_FORMAT=json switches the log files to JSON lines for log ingestion;
+# the console keeps the human-readable format
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+
 def setup_logger(name, log_file, level=logging.INFO):
     """Setup a logger with file and console handlers"""
     
@@ -55,9 +83,12 @@ def setup_logger(name, log_file, level=logging.INFO):
     # File handler
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(level)
-    file_formatter = DetailedFormatter(
-        '%(timestamp)s | %(prefix)s %(levelname)-8s | %(message)s'
-    )
+    if LOG_FORMAT == 'json':
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = DetailedFormatter(
+            '%(timestamp)s | %(prefix)s %(levelname)-8s | %(message)s'
+        )
     file_handler.setFormatter(file_formatter)
     logger.addHandler(file_handler)
     
@@ -158,14 +189,14 @@ def log_performance(operation, duration, details=None):
     performance_logger.info(f"⏱️  {operation}: {duration:.2f}s" + (f" - {details}" if details else ""))
 
 
-def log_warning(message):
-    """Log a warning"""
-    monitoring_logger.warning(message)
+def log_warning(message, *args, extra=None):
+    """Log a warning (%-style args are formatted only if the record is emitted)"""
+    monitoring_logger.warning(message, *args, extra=extra)
 
 
-def log_info(message):
-    """Log general information"""
-    monitoring_logger.info(message)
+def log_info(message, *args, extra=None):
+    """Log general information (%-style args are formatted only if the record is emitted)"""
+    monitoring_logger.info(message, *args, extra=extra)
 
 
 # Create a summary log entry on startup
@@ -9,7 +9,7 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, select
 
 from backend.database import SessionLocal
 from backend.models import (
@@ -39,6 +39,18 @@ class LongTermMonitor:
         risk_level: str = "MEDIUM"
     ) -> MonitoringSchedule:
         """Create a new monitoring schedule for a domain"""
+        return MonitoringSchedule(
+            **self.build_schedule_values(domain, cse_domain_id, duration_days, risk_level)
+        )
+    
+    def build_schedule_values(
+        self,
+        domain: str,
+        cse_domain_id: int,
+        duration_days: int = None,
+        risk_level: str = "MEDIUM"
+    ) -> Dict:
+        """Column values for a new monitoring schedule (usable for bulk inserts)"""
         if duration_days is None:
             duration_days = settings.DEFAULT_MONITORING_DURATION_DAYS
         
@@ -54,17 +66,15 @@ class LongTermMonitor:
         # Calculate next check time
         next_check = datetime.utcnow() + timedelta(hours=interval_hours)
         
-        schedule = MonitoringSchedule(
-            domain=domain,
-            cse_domain_id=cse_domain_id,
-            monitoring_duration_days=duration_days,
-            end_date=end_date,
-            monitoring_interval_hours=interval_hours,
-            next_check=next_check,
-            risk_level=risk_level
-        )
-        
-        return schedule
+        return {
+            'domain': domain,
+            'cse_domain_id': cse_domain_id,
+            'monitoring_duration_days': duration_days,
+            'end_date': end_date,
+            'monitoring_interval_hours': interval_hours,
+            'next_check': next_check,
+            'risk_level': risk_level
+        }
     
     def _get_monitoring_interval(self, risk_level: str) -> int:
         """Get monitoring interval based on risk level"""
@@ -96,8 +106,22 @@ class LongTermMonitor:
         finally:
             db.close()
     
-    def monitor_domain(self, schedule: MonitoringSchedule) -> Dict:
-        """Monitor a single domain for changes"""
+    def get_cse_domains(self, cse_domain_ids) -> Dict[int, CSEDomain]:
+        """Load several CSE domains in one query, keyed by id"""
+        ids = list(set(cse_domain_ids))
+        if not ids:
+            return {}
+        db = SessionLocal()
+        try:
+            return {
+                cse_domain.id: cse_domain
+                for cse_domain in db.query(CSEDomain).filter(CSEDomain.id.in_(ids))
+            }
+        finally:
+            db.close()
+    
+    def monitor_domain(self, schedule: MonitoringSchedule, cse_domain: Optional[CSEDomain] = None) -> Dict:
+        """Monitor a single domain for changes (cse_domain may be preloaded)"""
         db = SessionLocal()
         start_time = time.time()
         
@@ -105,9 +129,10 @@ class LongTermMonitor:
             log_info(f"Starting monitoring for {schedule.domain}")
             
             # Get CSE domain info
-            cse_domain = db.query(CSEDomain).filter(
-                CSEDomain.id == schedule.cse_domain_id
-            ).first()
+            if cse_domain is None:
+                cse_domain = db.query(CSEDomain).filter(
+                    CSEDomain.id == schedule.cse_domain_id
+                ).first()
             
             if not cse_domain:
                 log_error("monitor_domain", "CSE domain not found", schedule.domain)
@@ -418,34 +443,44 @@ class LongTermMonitor:
         finally:
             db.close()
     
-    def get_monitoring_statistics(self) -> Dict:
-        """Get monitoring statistics"""
-        db = SessionLocal()
-        try:
-            now = datetime.utcnow()
-            
-            total_schedules = db.query(MonitoringSchedule).count()
-            active_schedules = db.query(MonitoringSchedule).filter(
-                MonitoringSchedule.is_active == True
-            ).count()
-            
-            due_for_checking = db.query(MonitoringSchedule).filter(
-                and_(
-                    MonitoringSchedule.is_active == True,
-                    MonitoringSchedule.next_check <= now
-                )
-            ).count()
-            
-            recent_changes = db.query(ContentChangeLog).filter(
-                ContentChangeLog.detected_at >= now - timedelta(days=7)
-            ).count()
-            
-            return {
-                "total_schedules": total_schedules,
-                "active_schedules": active_schedules,
-                "due_for_checking": due_for_checking,
-                "recent_changes": recent_changes
+    def get_monitoring_statistics(self, db: Session) -> Dict:
+        """Get monitoring statistics using the caller's session"""
+        now = datetime.utcnow()
+        
+        # All counters in one round trip: FILTER aggregates read each
+        # monitoring_schedules row once, plus a scalar subquery for changes
+        active = MonitoringSchedule.is_active == True
+        counters = {
+            "total_schedules": func.count(MonitoringSchedule.id),
+            "active_schedules": func.count(MonitoringSchedule.id).filter(active),
+            "due_for_checking": func.count(MonitoringSchedule.id).filter(
+                and_(active, MonitoringSchedule.next_check <= now)
+            ),
+            "expired_schedules": func.count(MonitoringSchedule.id).filter(
+                and_(active, MonitoringSchedule.end_date <= now)
+            ),
+        }
+        risk_levels = ("HIGH", "MEDIUM", "LOW")
+        for level in risk_levels:
+            counters[f"active_{level.lower()}_risk"] = func.count(MonitoringSchedule.id).filter(
+                and_(active, func.upper(MonitoringSchedule.risk_level) == level)
+            )
+        counters["recent_changes"] = select(func.count(ContentChangeLog.id)).where(
+            ContentChangeLog.detected_at >= now - timedelta(days=7)
+        ).scalar_subquery()
+        
+        row = db.execute(
+            select(*(expr.label(name) for name, expr in counters.items()))
+        ).one()
+        stats = dict(row._mapping)
+        
+        return {
+            "total_schedules": stats["total_schedules"],
+            "active_schedules": stats["active_schedules"],
+            "due_for_checking": stats["due_for_checking"],
+            "recent_changes": stats["recent_changes"],
+            "expired_schedules": stats["expired_schedules"],
+            "active_by_risk": {
+                level: stats[f"active_{level.lower()}_risk"] for level in risk_levels
             }
-            
-        finally:
-            db.close()
+        }
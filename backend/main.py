@@ -14,7 +14,7 @@ from backend.models import CSEDomain, PhishingDetection, ScanHistory, Base, Moni
 from backend.schemas import (
     CSEDomainCreate, CSEDomainResponse, PhishingDetectionResponse,
     PhishingDetectionDetail, DashboardStats, ManualCheckRequest, BulkCSEImport,
-    BulkCSEImportResult
+    BulkCSEImportResult, BulkMonitoringScheduleCreate
 )
 from backend.config import settings
 from backend.monitoring_control import monitoring_controller
@@ -317,6 +317,17 @@ async def get_cse_domains(
     return domains
 
 
+def _enqueue_variation_generation(cse_domain_ids: List[int]):
+    """Queue one-off variation generation for newly added CSE domains"""
+    try:
+        from backend.worker import enqueue_variation_generation
+        for cse_domain_id in cse_domain_ids:
+            enqueue_variation_generation(cse_domain_id)
+    except Exception as e:
+        # The periodic scan queues generation for any domain still missing it
+        print(f"⚠️ Could not queue variation generation: {e}")
+
+
 @app.post("/api/cse-domains", response_model=CSEDomainResponse)
 async def add_cse_domain(
     domain_data: CSEDomainCreate,
@@ -387,6 +398,8 @@ async def add_cse_domain(
     db.commit()
     db.refresh(new_domain)
     
+    _enqueue_variation_generation([new_domain.id])
+    
     # Real-time notification removed for stability
     
     return new_domain
@@ -430,6 +443,8 @@ async def bulk_add_cse_domains(
         for domain_obj in added_domain_objs:
             db.refresh(domain_obj)
         
+        _enqueue_variation_generation([obj.id for obj in added_domain_objs])
+        
         # Convert to response format using from_attributes
         added_responses = [CSEDomainResponse.model_validate(obj) for obj in added_domain_objs]
         
@@ -1033,6 +1048,49 @@ async def create_monitoring_schedule(
         raise HTTPException(status_code=500, detail=f"Failed to create monitoring schedule: {str(e)}")
 
 
+@app.post("/api/monitoring/schedules/bulk")
+async def create_monitoring_schedules_bulk(
+    bulk_data: BulkMonitoringScheduleCreate,
+    db: Session = Depends(get_db)
+):
+    """Queue monitoring schedules for many domains, one task message per batch"""
+    try:
+        from celery import group
+        from backend.worker import create_monitoring_schedules_bulk, MONITORING_SCHEDULE_BATCH
+        
+        # Validate all referenced CSE domains in one query
+        cse_ids = {item.cse_domain_id for item in bulk_data.schedules}
+        known_ids = {
+            cse_id for (cse_id,) in db.query(CSEDomain.id).filter(CSEDomain.id.in_(cse_ids))
+        } if cse_ids else set()
+        missing = sorted(cse_ids - known_ids)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"CSE domains not found: {missing}")
+        
+        # One entry per domain (first wins), so no domain spans two batches
+        unique_schedules = {}
+        for item in bulk_data.schedules:
+            unique_schedules.setdefault(item.domain, item)
+        items = [
+            [item.domain, item.cse_domain_id, item.duration_days, item.risk_level]
+            for item in unique_schedules.values()
+        ]
+        batches = [items[i:i + MONITORING_SCHEDULE_BATCH] for i in range(0, len(items), MONITORING_SCHEDULE_BATCH)]
+        if batches:
+            group(create_monitoring_schedules_bulk.s(batch) for batch in batches).apply_async()
+        
+        return {
+            'status': 'queued',
+            'total': len(items),
+            'batches': len(batches)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue monitoring schedules: {str(e)}")
+
+
 @app.get("/api/monitoring/schedules")
 async def get_monitoring_schedules(
     skip: int = Query(0, ge=0),
@@ -14,6 +14,7 @@ class CSEDomain(Base):
     domain = Column(String, unique=True, nullable=False, index=True)
     added_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    variations_generated_at = Column(DateTime, nullable=True)  # Set once look-alike variations are stored
     
     # Relationship
     phishing_detections = relationship("PhishingDetection", back_populates="cse_domain")
@@ -28,6 +29,7 @@ class PhishingDetection(Base):
     
     # Domain Information
     phishing_domain = Column(String, nullable=False, index=True)
+    phishing_domain_norm = Column(String, nullable=True)  # lower(btrim(phishing_domain)), maintained by DB trigger
     variation_type = Column(String)  # typosquatting, combosquatting, etc.
     
     # Detection Information
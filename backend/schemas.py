@@ -125,3 +125,15 @@ class BulkCSEImportResult(BaseModel):
     total_skipped: int
     message: str
 
+
+
+# Bulk Monitoring Schedule Creation
+class MonitoringScheduleCreate(BaseModel):
+    domain: str
+    cse_domain_id: int
+    duration_days: Optional[int] = None
+    risk_level: str = "MEDIUM"
+
+
+class BulkMonitoringScheduleCreate(BaseModel):
+    schedules: List[MonitoringScheduleCreate]
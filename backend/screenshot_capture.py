@@ -5,10 +5,12 @@ Generates evidence PDFs for PS-02 submission
 """
 
 import os
+import re
 import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict
+from functools import lru_cache
+from typing import Optional, Dict, List
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.pdfgen import canvas
@@ -16,16 +18,30 @@ from reportlab.lib.utils import ImageReader
 from PIL import Image
 import io
 
+# Single-pass filename cleaning: drop URL schemes, turn path/port separators into '_'
+_CLEAN_RE = re.compile(r'https?://|[/:]')
+
+
+def _clean_for_filename(value: str) -> str:
+    """Make a domain or URL safe to use in a file name"""
+    return _CLEAN_RE.sub(lambda m: '' if m.group(0).startswith('http') else '_', value)
+
+
 class ScreenshotCapturer:
     """Capture screenshots of phishing domains"""
     
+    # Directories already created in this process (skips repeat mkdir syscalls)
+    _dirs_created = set()
+    
     def __init__(self, screenshots_dir="./screenshots", evidences_dir="./evidences"):
         self.screenshots_dir = Path(screenshots_dir)
         self.evidences_dir = Path(evidences_dir)
         
         # Create directories if they don't exist
-        self.screenshots_dir.mkdir(parents=True, exist_ok=True)
-        self.evidences_dir.mkdir(parents=True, exist_ok=True)
+        for directory in (self.screenshots_dir, self.evidences_dir):
+            if directory not in ScreenshotCapturer._dirs_created:
+                directory.mkdir(parents=True, exist_ok=True)
+                ScreenshotCapturer._dirs_created.add(directory)
     
     async def capture_screenshot(self, domain: str, url: str = None) -> Optional[str]:
         """
@@ -42,7 +58,7 @@ class ScreenshotCapturer:
             url = f"http://{domain}"
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        screenshot_filename = f"{domain.replace('/', '_').replace(':', '_')}_{timestamp}.png"
+        screenshot_filename = f"{_clean_for_filename(domain)}_{timestamp}.png"
         screenshot_path = self.screenshots_dir / screenshot_filename
         
         try:
@@ -166,7 +182,8 @@ class ScreenshotCapturer:
         screenshot_path: str,
         organization: str,
         domain: str,
-        serial_number: int
+        serial_number: int,
+        image_reader: Optional[ImageReader] = None
     ) -> Optional[str]:
         """
         Generate evidence PDF from screenshot for PS-02 submission
@@ -176,6 +193,7 @@ class ScreenshotCapturer:
             organization: Organization short name (e.g., "SBI", "PNB")
             domain: Domain name for naming
             serial_number: Serial number for evidence file
+            image_reader: Preloaded ImageReader for screenshot_path (optional)
         
         Returns:
             Path to generated PDF or None if failed
@@ -194,14 +212,14 @@ class ScreenshotCapturer:
                 subdomain = domain
             
             # Clean subdomain for filename (remove http://, https://, etc.)
-            subdomain = subdomain.replace('http://', '').replace('https://', '').replace('/', '_')
+            subdomain = _clean_for_filename(subdomain)
             
             # Create PDF filename
             pdf_filename = f"{organization}_{subdomain}_{serial_number}.pdf"
             pdf_path = self.evidences_dir / pdf_filename
             
             # Create PDF
-            c = canvas.Canvas(str(pdf_path), pagesize=A4)
+            c = canvas.Canvas(str(pdf_path), pagesize=A4, pageCompression=1)
             page_width, page_height = A4
             
             # Add title
@@ -214,10 +232,12 @@ class ScreenshotCapturer:
             c.drawString(50, page_height - 100, f"Evidence ID: {pdf_filename}")
             
             # Add screenshot
-            if os.path.exists(screenshot_path):
-                # Open and resize image if needed
-                img = Image.open(screenshot_path)
-                img_width, img_height = img.size
+            if image_reader is None and os.path.exists(screenshot_path):
+                image_reader = ImageReader(screenshot_path)
+            
+            if image_reader is not None:
+                # Scale image to fit the page
+                img_width, img_height = image_reader.getSize()
                 
                 # Calculate scaling to fit on page
                 max_width = page_width - 100  # 50px margin on each side
@@ -229,7 +249,7 @@ class ScreenshotCapturer:
                 
                 # Draw image
                 c.drawImage(
-                    screenshot_path,
+                    image_reader,
                     50,  # x position
                     page_height - 130 - new_height,  # y position
                     width=new_width,
@@ -247,6 +267,37 @@ class ScreenshotCapturer:
             print(f"❌ Failed to generate evidence PDF: {e}")
             return None
     
+    def generate_evidence_pdfs(self, jobs: List[Dict]) -> List[Optional[str]]:
+        """
+        Generate evidence PDFs for a batch, parsing each screenshot only once
+        
+        Args:
+            jobs: List of dicts with 'screenshot_path', 'organization',
+                  'domain' and 'serial_number' keys
+        
+        Returns:
+            List of PDF paths (None for failures) in the same order as jobs
+        """
+        readers = {}
+        pdf_paths = []
+        for job in jobs:
+            screenshot_path = job['screenshot_path']
+            if screenshot_path not in readers:
+                try:
+                    readers[screenshot_path] = ImageReader(screenshot_path)
+                except Exception as e:
+                    print(f"⚠️ Could not load screenshot {screenshot_path}: {e}")
+                    readers[screenshot_path] = None
+            
+            pdf_paths.append(self.generate_evidence_pdf(
+                screenshot_path,
+                job['organization'],
+                job['domain'],
+                job['serial_number'],
+                image_reader=readers[screenshot_path]
+            ))
+        return pdf_paths
+    
     async def capture_and_generate_evidence(
         self,
         domain: str,
@@ -280,15 +331,47 @@ class ScreenshotCapturer:
             result['evidence_pdf_path'] = pdf_path
         
         return result
+    
+    async def capture_batch(self, jobs: List[Dict]) -> List[Dict[str, Optional[str]]]:
+        """
+        Capture screenshots and evidence PDFs for several domains in one event loop
+        
+        Args:
+            jobs: List of dicts with 'domain', 'organization', 'serial_number'
+                  and optional 'url' keys
+        
+        Returns:
+            List of result dicts in the same order as jobs
+        """
+        results = []
+        for job in jobs:
+            results.append(await self.capture_and_generate_evidence(
+                job['domain'],
+                job['organization'],
+                job['serial_number'],
+                job.get('url')
+            ))
+        return results
+
 
+@lru_cache(maxsize=1)
+def get_capturer() -> ScreenshotCapturer:
+    """Shared capturer instance for the synchronous helpers"""
+    return ScreenshotCapturer()
 
-# Helper function for synchronous usage
+
+# Helper functions for synchronous usage
 def capture_evidence(domain: str, organization: str, serial_number: int, url: str = None):
     """Synchronous wrapper for screenshot capture"""
-    capturer = ScreenshotCapturer()
+    capturer = get_capturer()
     return asyncio.run(capturer.capture_and_generate_evidence(domain, organization, serial_number, url))
 
 
+def capture_batch_sync(jobs: List[Dict]) -> List[Dict[str, Optional[str]]]:
+    """Synchronous wrapper for batch capture using a single event loop"""
+    return asyncio.run(get_capturer().capture_batch(jobs))
+
+
 # Example usage
 if __name__ == "__main__":
     # Test
@@ -22,6 +22,7 @@ class SimpleDeduplicator:
     def __init__(self, db: Session):
         self.db = db
         self.similarity_threshold = 0.85
+        self.stream_batch_size = 5000
         
     def deduplicate_all_detections(self) -> Dict[str, Any]:
         """
@@ -29,30 +30,45 @@ class SimpleDeduplicator:
         """
         logger.info("Starting simple deduplication process...")
         
-        # Get all active detections
-        all_detections = self.db.query(PhishingDetection).filter(
+        # Stream active detections, projecting only the columns needed for
+        # grouping and best-detection scoring
+        query = self.db.query(
+            PhishingDetection.id,
+            PhishingDetection.phishing_domain,
+            PhishingDetection.phishing_domain_norm,
+            PhishingDetection.risk_score,
+            PhishingDetection.detected_at,
+            PhishingDetection.screenshot_path,
+            PhishingDetection.evidence_pdf_path,
+            PhishingDetection.registrar,
+            PhishingDetection.registrant,
+            PhishingDetection.ip_address,
+            PhishingDetection.ssl_issuer
+        ).filter(
             PhishingDetection.is_active == True
-        ).all()
+        ).execution_options(stream_results=True).yield_per(self.stream_batch_size)
         
-        logger.info(f"Found {len(all_detections)} active detections")
+        # Group by exact domain matches as rows arrive
+        total_detections = 0
+        domain_groups = {}
+        for row in query:
+            total_detections += 1
+            # phishing_domain_norm is only filled once init_db() has applied the
+            # schema upgrades; without the fallback every row would group under None
+            domain_key = row.phishing_domain_norm or (row.phishing_domain or '').lower().strip()
+            domain_groups.setdefault(domain_key, []).append(row)
+        
+        logger.info(f"Found {total_detections} active detections")
         
-        if len(all_detections) < 2:
+        if total_detections < 2:
             return {
-                'total_detections': len(all_detections),
+                'total_detections': total_detections,
                 'duplicates_found': 0,
                 'duplicates_removed': 0,
-                'unique_detections': len(all_detections),
+                'unique_detections': total_detections,
                 'clusters_created': 0
             }
         
-        # Group by exact domain matches first
-        domain_groups = {}
-        for detection in all_detections:
-            domain = detection.phishing_domain.lower().strip()
-            if domain not in domain_groups:
-                domain_groups[domain] = []
-            domain_groups[domain].append(detection)
-        
         # Process each group
         removed_count = 0
         kept_count = 0
@@ -61,18 +77,23 @@ class SimpleDeduplicator:
             if len(detections) > 1:
                 # Keep the best detection, mark others as inactive
                 best_detection = self._select_best_detection(detections)
-                duplicates = [d for d in detections if d.id != best_detection.id]
+                duplicate_ids = [d.id for d in detections if d.id != best_detection.id]
+                
+                # Only the duplicates are loaded as full rows for the update
+                duplicates = self.db.query(PhishingDetection).filter(
+                    PhishingDetection.id.in_(duplicate_ids)
+                ).all()
                 
                 # Mark duplicates as inactive
                 for duplicate in duplicates:
                     duplicate.is_active = False
                     duplicate.detection_metadata = {
-                        **duplicate.detection_metadata,
+                        **(duplicate.detection_metadata or {}),
                         'deduplication_reason': 'exact_domain_duplicate',
                         'duplicate_of_id': best_detection.id,
                         'deduplicated_at': datetime.now().isoformat()
                     }
-                    removed_count += len(duplicates)
+                    removed_count += 1
                 
                 kept_count += 1
             else:
@@ -84,7 +105,7 @@ class SimpleDeduplicator:
         logger.info(f"Deduplication complete: {removed_count} removed, {kept_count} kept")
         
         return {
-            'total_detections': len(all_detections),
+            'total_detections': total_detections,
             'duplicates_found': len([g for g in domain_groups.values() if len(g) > 1]),
             'duplicates_removed': removed_count,
             'unique_detections': kept_count,
@@ -146,7 +167,9 @@ class SimpleDeduplicator:
         inactive_detections = total_detections - active_detections
         
         # Get unique domains
-        unique_domains = self.db.query(PhishingDetection.phishing_domain).filter(
+        unique_domains = self.db.query(
+            func.coalesce(PhishingDetection.phishing_domain_norm, func.lower(func.btrim(PhishingDetection.phishing_domain)))
+        ).filter(
             PhishingDetection.is_active == True
         ).distinct().count()
         
@@ -15,25 +15,58 @@ All APIs are FREE to use! Some require approval but no payment.
 
 import re
 import requests
+import tldextract
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from urllib.parse import urlparse
 import time
 import os
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+def _create_session() -> requests.Session:
+    """HTTP session with keep-alive connection pooling and retry on transient errors"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Safe Browsing threatMatches:find accepts up to 500 threatEntries per request
+SAFE_BROWSING_BATCH_SIZE = 500
+
+# URL pattern (compiled once; '$-_' is a character range that also covers
+# the path/query punctuation '/', ':', '=', '?')
+_URL_RE = re.compile(r'https?://(?:[a-zA-Z0-9$-_@.&+!*(),]|%[0-9a-fA-F]{2})+')
+
 
 class SocialMediaScanner:
     """Scan social media for phishing links"""
     
     def __init__(self):
         self.detected_urls = []
+        self._session = _create_session()
+        
+        # CSE base-name matcher, rebuilt only when the CSE list changes
+        self._cse_domains_key = None
+        self._cse_bases = []
+        self._cse_automaton = None
         
     def extract_urls_from_text(self, text: str) -> List[str]:
         """Extract URLs from text"""
-        # URL pattern
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        urls = re.findall(url_pattern, text)
-        return urls
+        return _URL_RE.findall(text)
     
     def is_suspicious_domain(self, url: str, cse_domains: List[str]) -> Dict:
         """
@@ -51,11 +84,8 @@ class SocialMediaScanner:
             domain = parsed.netloc.lower()
             
             # Check if domain contains CSE domain name but isn't exact match
-            for cse_domain in cse_domains:
-                cse_base = cse_domain.replace('.com', '').replace('.in', '').replace('.org', '')
-                
-                # If CSE name is in the suspicious domain but not exact match
-                if cse_base.lower() in domain and domain != cse_domain.lower():
+            for cse_base, cse_domain in self._match_cse_bases(domain, cse_domains):
+                if domain != cse_domain.lower():
                     return {
                         'suspicious': True,
                         'phishing_domain': domain,
@@ -69,6 +99,42 @@ class SocialMediaScanner:
         except Exception as e:
             return {'suspicious': False, 'error': str(e)}
     
+    def _prepare_cse_matcher(self, cse_domains: List[str]):
+        """Precompute CSE base names (and the Aho-Corasick automaton) for a CSE list"""
+        key = tuple(cse_domains)
+        if key == self._cse_domains_key:
+            return
+        
+        # Registrable label without the public suffix (sbi.co.in -> sbi)
+        self._cse_bases = []
+        for cse_domain in cse_domains:
+            cse_base = tldextract.extract(cse_domain).domain
+            if cse_base:
+                self._cse_bases.append((cse_base, cse_domain))
+        
+        self._cse_automaton = None
+        if AHOCORASICK_AVAILABLE and self._cse_bases:
+            automaton = ahocorasick.Automaton()
+            for cse_base, cse_domain in self._cse_bases:
+                automaton.add_word(cse_base.lower(), (cse_base, cse_domain))
+            automaton.make_automaton()
+            self._cse_automaton = automaton
+        
+        self._cse_domains_key = key
+    
+    def _match_cse_bases(self, domain: str, cse_domains: List[str]):
+        """Yield (cse_base, cse_domain) pairs whose base name occurs in domain"""
+        self._prepare_cse_matcher(cse_domains)
+        
+        if self._cse_automaton is not None:
+            # Single linear pass over the domain, whatever the CSE list size
+            for _, match in self._cse_automaton.iter(domain):
+                yield match
+        else:
+            for cse_base, cse_domain in self._cse_bases:
+                if cse_base.lower() in domain:
+                    yield cse_base, cse_domain
+    
     def scan_twitter_search(
         self,
         cse_domain: str,
@@ -95,35 +161,31 @@ class SocialMediaScanner:
         
         try:
             # Use the TwitterAPIScanner for actual implementation
-            twitter_scanner = TwitterAPIScanner(self.bearer_token)
+            twitter_scanner = TwitterAPIScanner(self.bearer_token, session=self._session)
             
-            # Search queries
-            queries = [
-                f'"{organization_name}" phishing',
-                f'"{cse_domain}" scam',
-                f'"{organization_name}" fake',
-                f'"{cse_domain}" suspicious'
-            ]
+            # Single boolean query covering the name/domain x keyword combinations
+            query = (
+                f'("{organization_name}" OR "{cse_domain}") '
+                f'(phishing OR scam OR fake OR suspicious) -is:retweet has:links'
+            )
+            tweets = twitter_scanner.search_recent_tweets(query, max(max_results, 10))
             
-            for query in queries:
-                tweets = twitter_scanner.search_recent_tweets(query, max_results // len(queries))
+            for tweet in tweets:
+                # Prefer the expanded URLs parsed by the API (resolves t.co links)
+                urls = tweet.get('urls') or self.extract_urls_from_text(tweet['text'])
                 
-                for tweet in tweets:
-                    # Extract URLs from tweet
-                    urls = self.extract_urls_from_text(tweet['text'])
-                    
-                    for url in urls:
-                        # Check if URL is suspicious
-                        suspicious_info = self.is_suspicious_domain(url, [cse_domain])
-                        if suspicious_info.get('suspicious'):
-                            detections.append({
-                                'url': url,
-                                'platform': 'twitter',
-                                'tweet_id': tweet['id'],
-                                'tweet_text': tweet['text'],
-                                'created_at': tweet['created_at'],
-                                'suspicious_info': suspicious_info
-                            })
+                for url in urls:
+                    # Check if URL is suspicious
+                    suspicious_info = self.is_suspicious_domain(url, [cse_domain])
+                    if suspicious_info.get('suspicious'):
+                        detections.append({
+                            'url': url,
+                            'platform': 'twitter',
+                            'tweet_id': tweet['id'],
+                            'tweet_text': tweet['text'],
+                            'created_at': tweet['created_at'],
+                            'suspicious_info': suspicious_info
+                        })
             
             print(f"🐦 Twitter scan complete for {organization_name}: {len(detections)} suspicious URLs found")
             
@@ -237,39 +299,72 @@ class SocialMediaScanner:
             print(f"   Get FREE key: https://developers.google.com/safe-browsing/v4/get-started")
             return {'checked': False}
         
-        try:
-            endpoint = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
-            
-            payload = {
-                "client": {
-                    "clientId": "phishing-detection-system",
-                    "clientVersion": "1.0.0"
-                },
-                "threatInfo": {
-                    "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE"],
-                    "platformTypes": ["ANY_PLATFORM"],
-                    "threatEntryTypes": ["URL"],
-                    "threatEntries": [{"url": url}]
+        return self.check_google_safe_browsing_batch([url], api_key)[0]
+    
+    def check_google_safe_browsing_batch(
+        self,
+        urls: List[str],
+        api_key: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Check many URLs against Google Safe Browsing API
+        
+        Sends up to 500 URLs per threatMatches:find request instead of one
+        request per URL, saving round-trips and daily quota.
+        
+        Returns:
+            List of result dicts in the same order as urls
+        """
+        api_key = api_key or os.getenv('GOOGLE_SAFE_BROWSING_API_KEY')
+        
+        if not api_key:
+            print(f"   ⚠️ Google Safe Browsing API key not configured")
+            print(f"   Get FREE key: https://developers.google.com/safe-browsing/v4/get-started")
+            return [{'checked': False} for _ in urls]
+        
+        endpoint = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
+        results = []
+        
+        for start in range(0, len(urls), SAFE_BROWSING_BATCH_SIZE):
+            chunk = urls[start:start + SAFE_BROWSING_BATCH_SIZE]
+            try:
+                payload = {
+                    "client": {
+                        "clientId": "phishing-detection-system",
+                        "clientVersion": "1.0.0"
+                    },
+                    "threatInfo": {
+                        "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE"],
+                        "platformTypes": ["ANY_PLATFORM"],
+                        "threatEntryTypes": ["URL"],
+                        "threatEntries": [{"url": url} for url in chunk]
+                    }
                 }
-            }
-            
-            response = requests.post(endpoint, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                is_malicious = bool(result.get('matches'))
                 
-                return {
-                    'checked': True,
-                    'is_malicious': is_malicious,
-                    'threats': result.get('matches', []),
-                    'source': 'google_safe_browsing'
-                }
-            else:
-                return {'checked': False, 'error': f'HTTP {response.status_code}'}
+                response = self._session.post(endpoint, json=payload)
                 
-        except Exception as e:
-            return {'checked': False, 'error': str(e)}
+                if response.status_code == 200:
+                    # Map matches back to the URLs they were reported for
+                    matches_by_url = {}
+                    for match in response.json().get('matches', []):
+                        matched_url = match.get('threat', {}).get('url')
+                        matches_by_url.setdefault(matched_url, []).append(match)
+                    
+                    for url in chunk:
+                        threats = matches_by_url.get(url, [])
+                        results.append({
+                            'checked': True,
+                            'is_malicious': bool(threats),
+                            'threats': threats,
+                            'source': 'google_safe_browsing'
+                        })
+                else:
+                    results.extend({'checked': False, 'error': f'HTTP {response.status_code}'} for _ in chunk)
+                    
+            except Exception as e:
+                results.extend({'checked': False, 'error': str(e)} for _ in chunk)
+        
+        return results
     
     def scan_all_platforms(
         self,
@@ -323,10 +418,11 @@ class TwitterAPIScanner:
     3. Set environment variable: TWITTER_BEARER_TOKEN
     """
     
-    def __init__(self, bearer_token: Optional[str] = None):
+    def __init__(self, bearer_token: Optional[str] = None, session: Optional[requests.Session] = None):
         import os
         self.bearer_token = bearer_token or os.getenv('TWITTER_BEARER_TOKEN')
         self.base_url = "https://api.twitter.com/2"
+        self._session = session or _create_session()
     
     def search_recent_tweets(
         self,
@@ -359,7 +455,7 @@ class TwitterAPIScanner:
         }
         
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/tweets/search/recent",
                 headers=headers,
                 params=params
@@ -12,10 +12,53 @@ from pathlib import Path
 import time
 import hashlib
 import re
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Compact JSON encoding for the on-disk caches"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
 
 logger = logging.getLogger(__name__)
 
+DNS_RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'TXT']
+
+
+@lru_cache(maxsize=1)
+def _get_dns_pool() -> ThreadPoolExecutor:
+    """Executor for per-record-type DNS queries, shared by every gatherer in the process"""
+    return ThreadPoolExecutor(max_workers=len(DNS_RECORD_TYPES) * 8, thread_name_prefix='ti-dns')
+
+# URLhaus csv_recent columns:
+# id, dateadded, url, url_status, last_online, threat, tags, urlhaus_link, reporter
+URLHAUS_URL = 2
+URLHAUS_THREAT = 5
+URLHAUS_TAGS = 6
+
 @dataclass
 class ThreatIntelData:
     """Structured threat intelligence data"""
@@ -31,6 +74,88 @@ class ThreatIntelData:
     enrichment_data: Dict[str, Any] = None
     last_updated: datetime = None
 
+class _DomainTrie:
+    """
+    Reverse-label trie of feed hostnames ('com' -> 'example' -> 'www').
+    
+    A lookup walks the queried domain's labels right to left, so it costs
+    O(labels) regardless of how many feed entries were inserted.
+    """
+    
+    _END = '_end'  # entry whose hostname ends at this node
+    _SUB = '_sub'  # first entry whose hostname is at or below this node
+    
+    def __init__(self):
+        self.root = {}
+        self.hosts: Dict[str, Any] = {}  # exact hostname -> first entry
+    
+    def insert(self, hostname: str, entry: Any):
+        self.hosts.setdefault(hostname, entry)
+        node = self.root
+        for label in reversed(hostname.split('.')):
+            node = node.setdefault(label, {})
+            node.setdefault(self._SUB, entry)
+        node.setdefault(self._END, entry)
+    
+    def find(self, domain: str) -> Optional[Any]:
+        """
+        Return a feed entry for the domain, one of its subdomains, or one of
+        its parent domains; None if the feeds do not mention it.
+        """
+        # Exact hostname hits (the common case) need a single hash lookup
+        entry = self.hosts.get(domain)
+        if entry is not None:
+            return entry
+        
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                return None
+            if self._END in node:
+                return node[self._END]
+        return node.get(self._SUB)
+    
+    @classmethod
+    def from_urls(cls, entries: List[Any], url_of=lambda entry: entry) -> '_DomainTrie':
+        """Build a trie from feed entries, keyed by each entry's URL hostname"""
+        trie = cls()
+        for entry in entries:
+            try:
+                hostname = urlparse(url_of(entry) or '').hostname
+            except ValueError:
+                continue
+            if hostname:
+                trie.insert(hostname, entry)
+        return trie
+
+
+class _DomainRateLimiter:
+    """
+    Minimum delay between requests to the same host, shared across threads.
+    
+    Each caller reserves the next free slot for its host under the lock and
+    then sleeps outside it, so concurrent workers are spaced out rather than
+    bursting together.
+    """
+    
+    def __init__(self, min_delay: Dict[str, float]):
+        self.min_delay = min_delay
+        self.last_request_time: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host: str):
+        delay = self.min_delay.get(host, self.min_delay.get('default', 0.0))
+        if delay <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.last_request_time.get(host, 0.0) + delay)
+            self.last_request_time[host] = slot
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class ThreatIntelligenceGatherer:
     """Gathers threat intelligence from multiple sources"""
     
@@ -42,16 +167,43 @@ class ThreatIntelligenceGatherer:
         self.session.headers.update({
             'User-Agent': 'PhishingDetectionSystem/1.0'
         })
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # ip-api.com free tier: 45 single lookups/min, 15 batch requests/min
+        self.rate_limiter = _DomainRateLimiter({
+            'ip-api.com': 1.4,
+            'ip-api.com/batch': 4.0,
+            'default': 0.0
+        })
         
         # API endpoints (all free and open-source)
         self.phishtank_url = "http://data.phishtank.com/data/online-valid.json"
         self.openphish_url = "https://openphish.com/feed.txt"
         self.urlhaus_url = "https://urlhaus.abuse.ch/downloads/csv_recent/"  # Free CSV download
+        self.ip_api_url = "http://ip-api.com/json"
+        self.ip_api_batch_url = "http://ip-api.com/batch"
+        self.ip_api_batch_size = 100  # ip-api.com batch endpoint limit
+        
+        # Enrichment is network-bound: domains are checked concurrently and
+        # each domain's DNS record types are queried in parallel on the
+        # process-wide _get_dns_pool()
+        self.max_workers = 64
         
         # Cache files
-        self.phishtank_cache = self.cache_dir / "phishtank.json"
+        self.phishtank_cache = self.cache_dir / "phishtank.ndjson"
         self.openphish_cache = self.cache_dir / "openphish.txt"
-        self.urlhaus_cache = self.cache_dir / "urlhaus.json"
+        self.urlhaus_cache = self.cache_dir / "urlhaus.ndjson"
+        
+        # Parsed feed data keyed by cache file, as (mtime, data)
+        self._feed_cache: Dict[Path, Tuple[float, Any]] = {}
+        
+        # Hostname tries built from the feeds, rebuilt when a cache file changes
+        self._phishtank_trie = None
+        self._openphish_trie = None
+        self._urlhaus_trie = None
+        self._trie_mtimes = None
     
     def _is_cache_valid(self, cache_file: Path) -> bool:
         """Check if cache file is still valid"""
@@ -61,14 +213,24 @@ class ThreatIntelligenceGatherer:
         return age < self.cache_ttl
     
     def _load_from_cache(self, cache_file: Path) -> Optional[Any]:
-        """Load data from cache file"""
+        """Load data from cache file, reusing the parsed copy while the file is unchanged"""
         try:
+            mtime = cache_file.stat().st_mtime
+            cached = self._feed_cache.get(cache_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            
             if cache_file.suffix == '.json':
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+                data = _json_loads(cache_file.read_bytes())
+            elif cache_file.suffix == '.ndjson':
+                with open(cache_file, 'rb') as f:
+                    data = [_json_loads(line) for line in f if line.strip()]
             else:
                 with open(cache_file, 'r') as f:
-                    return f.read().strip().split('\n')
+                    data = f.read().strip().split('\n')
+            
+            self._feed_cache[cache_file] = (mtime, data)
+            return data
         except Exception as e:
             logger.warning(f"Failed to load cache {cache_file}: {e}")
             return None
@@ -77,14 +239,19 @@ class ThreatIntelligenceGatherer:
         """Save data to cache file"""
         try:
             if cache_file.suffix == '.json':
-                with open(cache_file, 'w') as f:
-                    json.dump(data, f, indent=2)
+                cache_file.write_bytes(_json_dumps(data))
+            elif cache_file.suffix == '.ndjson':
+                with open(cache_file, 'wb') as f:
+                    for item in data:
+                        f.write(_json_dumps(item))
+                        f.write(b'\n')
             else:
                 with open(cache_file, 'w') as f:
                     if isinstance(data, list):
                         f.write('\n'.join(data))
                     else:
                         f.write(str(data))
+            self._feed_cache[cache_file] = (cache_file.stat().st_mtime, data)
         except Exception as e:
             logger.warning(f"Failed to save cache {cache_file}: {e}")
     
@@ -92,15 +259,31 @@ class ThreatIntelligenceGatherer:
         """Fetch PhishTank data"""
         try:
             if self._is_cache_valid(self.phishtank_cache):
-                logger.info("Using cached PhishTank data")
+                logger.debug("Using cached PhishTank data")
                 return self._load_from_cache(self.phishtank_cache) or []
             
             logger.info("Fetching PhishTank data...")
-            response = self.session.get(self.phishtank_url, timeout=30)
+            response = self.session.get(self.phishtank_url, timeout=30, stream=True)
             response.raise_for_status()
             
-            data = response.json()
-            self._save_to_cache(data, self.phishtank_cache)
+            if not IJSON_AVAILABLE:
+                data = response.json()
+                self._save_to_cache(data, self.phishtank_cache)
+            else:
+                # Parse the JSON array incrementally and write the NDJSON
+                # cache as entries arrive, instead of materializing the whole
+                # response body and then re-serializing it
+                response.raw.decode_content = True
+                data = []
+                tmp_file = self.phishtank_cache.with_suffix('.tmp')
+                with open(tmp_file, 'wb') as f:
+                    for entry in ijson.items(response.raw, 'item', use_float=True):
+                        f.write(_json_dumps(entry))
+                        f.write(b'\n')
+                        data.append(entry)
+                tmp_file.replace(self.phishtank_cache)
+                self._feed_cache[self.phishtank_cache] = (self.phishtank_cache.stat().st_mtime, data)
+            
             logger.info(f"Fetched {len(data)} PhishTank entries")
             return data
             
@@ -112,7 +295,7 @@ class ThreatIntelligenceGatherer:
         """Fetch OpenPhish data"""
         try:
             if self._is_cache_valid(self.openphish_cache):
-                logger.info("Using cached OpenPhish data")
+                logger.debug("Using cached OpenPhish data")
                 return self._load_from_cache(self.openphish_cache) or []
             
             logger.info("Fetching OpenPhish data...")
@@ -132,19 +315,24 @@ class ThreatIntelligenceGatherer:
         """Fetch URLhaus data from free CSV feed"""
         try:
             if self._is_cache_valid(self.urlhaus_cache):
-                logger.info("Using cached URLhaus data")
+                logger.debug("Using cached URLhaus data")
                 return self._load_from_cache(self.urlhaus_cache) or []
             
             logger.info("Fetching URLhaus data...")
-            response = self.session.get(self.urlhaus_url, timeout=30)
+            response = self.session.get(self.urlhaus_url, timeout=30, stream=True)
             response.raise_for_status()
             
-            # Parse CSV data
-            import csv
-            import io
-            csv_data = response.text
-            csv_reader = csv.DictReader(io.StringIO(csv_data))
-            urls = list(csv_reader)
+            # Stream-parse the CSV, skipping the '#' comment header, and keep
+            # only the fields used downstream
+            lines = (
+                line for line in response.iter_lines(decode_unicode=True)
+                if line and not line.startswith('#')
+            )
+            urls = [
+                {'url': row[URLHAUS_URL], 'threat': row[URLHAUS_THREAT], 'tags': row[URLHAUS_TAGS]}
+                for row in csv.reader(lines)
+                if len(row) > URLHAUS_TAGS
+            ]
             
             self._save_to_cache(urls, self.urlhaus_cache)
             logger.info(f"Fetched {len(urls)} URLhaus entries")
@@ -154,8 +342,105 @@ class ThreatIntelligenceGatherer:
             logger.error(f"Failed to fetch URLhaus data: {e}")
             return self._load_from_cache(self.urlhaus_cache) or []
     
-    def enrich_domain_data(self, domain: str) -> Dict[str, Any]:
-        """Enrich domain with IP, ASN, DNS, and other data"""
+    def fetch_all_feeds(self) -> Tuple[List[Dict[str, Any]], List[str], List[Dict[str, Any]]]:
+        """Fetch PhishTank, OpenPhish and URLhaus concurrently (each is a separate host)"""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            phishtank = executor.submit(self.fetch_phishtank_data)
+            openphish = executor.submit(self.fetch_openphish_data)
+            urlhaus = executor.submit(self.fetch_urlhaus_data)
+            return phishtank.result(), openphish.result(), urlhaus.result()
+    
+    def _cache_mtimes(self) -> Tuple[Optional[float], ...]:
+        """Modification times of the three feed cache files"""
+        return tuple(
+            cache_file.stat().st_mtime if cache_file.exists() else None
+            for cache_file in (self.phishtank_cache, self.openphish_cache, self.urlhaus_cache)
+        )
+    
+    def _refresh_feed_tries(self):
+        """Rebuild the feed hostname tries if any feed cache expired or changed"""
+        caches = (self.phishtank_cache, self.openphish_cache, self.urlhaus_cache)
+        if self._trie_mtimes is not None and all(self._is_cache_valid(c) for c in caches):
+            return
+        
+        phishtank_data, openphish_data, urlhaus_data = self.fetch_all_feeds()
+        
+        mtimes = self._cache_mtimes()
+        if mtimes == self._trie_mtimes:
+            return
+        
+        self._phishtank_trie = _DomainTrie.from_urls(phishtank_data, lambda e: e.get('url'))
+        self._openphish_trie = _DomainTrie.from_urls(openphish_data)
+        self._urlhaus_trie = _DomainTrie.from_urls(urlhaus_data, lambda e: e.get('url'))
+        self._trie_mtimes = mtimes
+        logger.info(
+            "Indexed threat feeds: %d PhishTank, %d OpenPhish, %d URLhaus entries",
+            len(phishtank_data), len(openphish_data), len(urlhaus_data)
+        )
+    
+    def _geo_from_response(self, geo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map an ip-api.com result onto enrichment fields"""
+        return {
+            'country': geo_data.get('country'),
+            'isp': geo_data.get('isp'),
+            'asn': geo_data.get('as'),
+            'asn_org': geo_data.get('org')
+        }
+    
+    def _lookup_geo(self, ip: str) -> Dict[str, Any]:
+        """IP geolocation for a single address (using free service)"""
+        try:
+            self.rate_limiter.wait('ip-api.com')
+            geo_response = self.session.get(f"{self.ip_api_url}/{ip}", timeout=10)
+            if geo_response.status_code == 200:
+                return self._geo_from_response(geo_response.json())
+        except:
+            pass
+        return {}
+    
+    def _lookup_geo_batch(self, ips: List[str]) -> Dict[str, Dict[str, Any]]:
+        """IP geolocation for many addresses via the ip-api.com batch endpoint"""
+        geo_by_ip = {}
+        unique_ips = list(dict.fromkeys(ips))
+        for start in range(0, len(unique_ips), self.ip_api_batch_size):
+            chunk = unique_ips[start:start + self.ip_api_batch_size]
+            try:
+                self.rate_limiter.wait('ip-api.com/batch')
+                geo_response = self.session.post(self.ip_api_batch_url, json=chunk, timeout=10)
+                if geo_response.status_code == 200:
+                    for geo_data in geo_response.json():
+                        if geo_data.get('status') == 'success':
+                            geo_by_ip[geo_data.get('query')] = self._geo_from_response(geo_data)
+            except Exception as e:
+                logger.warning(f"Batch geolocation failed for {len(chunk)} IPs: {e}")
+        return geo_by_ip
+    
+    def _resolve_dns_records(self, domain: str) -> Dict[str, List[str]]:
+        """Query all DNS record types for a domain in parallel"""
+        import dns.resolver
+        
+        def resolve(record_type):
+            try:
+                answers = dns.resolver.resolve(domain, record_type)
+                return record_type, [str(r) for r in answers]
+            except:
+                return record_type, None
+        
+        records = {}
+        for record_type, values in _get_dns_pool().map(resolve, DNS_RECORD_TYPES):
+            if values is not None:
+                records[record_type] = values
+        return records
+    
+    def enrich_domain_data(self, domain: str, include_geo: bool = True) -> Dict[str, Any]:
+        """
+        Enrich domain with IP, ASN, DNS, and other data
+        
+        Args:
+            domain: Domain to enrich
+            include_geo: Look up IP geolocation here; batch callers pass False
+                         and geolocate all IPs in one request afterwards
+        """
         enrichment = {
             'ip_address': None,
             'asn': None,
@@ -169,87 +454,68 @@ class ThreatIntelligenceGatherer:
         }
         
         try:
-            # Basic DNS resolution
-            import socket
+            # DNS records (the A answer doubles as the hosting IP)
             try:
-                ip = socket.gethostbyname(domain)
-                enrichment['ip_address'] = ip
-            except:
-                pass
-            
-            # IP geolocation (using free service)
-            if enrichment['ip_address']:
+                enrichment['dns_records'] = self._resolve_dns_records(domain)
+                a_records = enrichment['dns_records'].get('A')
+                if a_records:
+                    enrichment['ip_address'] = a_records[0]
+            except ImportError:
+                logger.warning("dnspython not available, skipping DNS enrichment")
+                
+                # Basic DNS resolution
+                import socket
                 try:
-                    geo_response = self.session.get(
-                        f"http://ip-api.com/json/{enrichment['ip_address']}",
-                        timeout=10
-                    )
-                    if geo_response.status_code == 200:
-                        geo_data = geo_response.json()
-                        enrichment.update({
-                            'country': geo_data.get('country'),
-                            'isp': geo_data.get('isp'),
-                            'asn': geo_data.get('as'),
-                            'asn_org': geo_data.get('org')
-                        })
+                    enrichment['ip_address'] = socket.gethostbyname(domain)
                 except:
                     pass
             
-            # DNS records
-            try:
-                import dns.resolver
-                records = {}
-                for record_type in ['A', 'AAAA', 'MX', 'NS', 'TXT']:
-                    try:
-                        answers = dns.resolver.resolve(domain, record_type)
-                        records[record_type] = [str(r) for r in answers]
-                    except:
-                        pass
-                enrichment['dns_records'] = records
-            except ImportError:
-                logger.warning("dnspython not available, skipping DNS enrichment")
+            # IP geolocation
+            if include_geo and enrichment['ip_address']:
+                enrichment.update(self._lookup_geo(enrichment['ip_address']))
             
         except Exception as e:
             logger.warning(f"Domain enrichment failed for {domain}: {e}")
         
         return enrichment
     
+    def _match_feeds(self, ti_data: ThreatIntelData):
+        """Set the feed-membership fields of ti_data from the loaded feed tries"""
+        lookup_domain = ti_data.domain.lower().strip().rstrip('.')
+        
+        # Check PhishTank
+        entry = self._phishtank_trie.find(lookup_domain)
+        if entry is not None:
+            ti_data.in_phishtank = True
+            ti_data.phishtank_verified = entry.get('verified', False)
+            ti_data.phishtank_url = entry.get('url')
+        
+        # Check OpenPhish
+        url = self._openphish_trie.find(lookup_domain)
+        if url is not None:
+            ti_data.in_openphish = True
+            ti_data.openphish_url = url
+        
+        # Check URLhaus
+        entry = self._urlhaus_trie.find(lookup_domain)
+        if entry is not None:
+            ti_data.in_urlhaus = True
+            ti_data.urlhaus_url = entry.get('url')
+        
+        # Calculate blacklist hits
+        ti_data.blacklist_hits = sum([
+            ti_data.in_phishtank,
+            ti_data.in_openphish,
+            ti_data.in_urlhaus
+        ])
+    
     def check_domain_in_feeds(self, domain: str) -> ThreatIntelData:
         """Check if domain appears in threat intelligence feeds"""
         ti_data = ThreatIntelData(domain=domain, last_updated=datetime.now())
         
         try:
-            # Check PhishTank
-            phishtank_data = self.fetch_phishtank_data()
-            for entry in phishtank_data:
-                if domain in entry.get('url', ''):
-                    ti_data.in_phishtank = True
-                    ti_data.phishtank_verified = entry.get('verified', False)
-                    ti_data.phishtank_url = entry.get('url')
-                    break
-            
-            # Check OpenPhish
-            openphish_data = self.fetch_openphish_data()
-            for url in openphish_data:
-                if domain in url:
-                    ti_data.in_openphish = True
-                    ti_data.openphish_url = url
-                    break
-            
-            # Check URLhaus
-            urlhaus_data = self.fetch_urlhaus_data()
-            for entry in urlhaus_data:
-                if domain in entry.get('url', ''):
-                    ti_data.in_urlhaus = True
-                    ti_data.urlhaus_url = entry.get('url')
-                    break
-            
-            # Calculate blacklist hits
-            ti_data.blacklist_hits = sum([
-                ti_data.in_phishtank,
-                ti_data.in_openphish,
-                ti_data.in_urlhaus
-            ])
+            self._refresh_feed_tries()
+            self._match_feeds(ti_data)
             
             # Enrich with additional data
             ti_data.enrichment_data = self.enrich_domain_data(domain)
@@ -259,22 +525,49 @@ class ThreatIntelligenceGatherer:
         
         return ti_data
     
+    def _safe_enrich(self, domain: str) -> Optional[Dict[str, Any]]:
+        """enrich_domain_data for batch use: never raises, defers geolocation"""
+        try:
+            return self.enrich_domain_data(domain, include_geo=False)
+        except Exception as e:
+            logger.warning(f"Failed to enrich {domain}: {e}")
+            return None
+    
     def batch_check_domains(self, domains: List[str]) -> List[ThreatIntelData]:
-        """Check multiple domains for threat intelligence"""
-        results = []
+        """
+        Check multiple domains for threat intelligence
         
+        Feed matching is a few dict lookups per domain and runs inline; only
+        the network-bound enrichment is fanned out to worker threads.
+        """
         logger.info(f"Checking {len(domains)} domains for threat intelligence...")
         
-        for i, domain in enumerate(domains):
-            if i % 100 == 0:
-                logger.info(f"Processed {i}/{len(domains)} domains")
-            
-            try:
-                ti_data = self.check_domain_in_feeds(domain)
-                results.append(ti_data)
-            except Exception as e:
-                logger.warning(f"Failed to check {domain}: {e}")
-                results.append(ThreatIntelData(domain=domain))
+        results = [ThreatIntelData(domain=domain, last_updated=datetime.now()) for domain in domains]
+        
+        try:
+            self._refresh_feed_tries()
+            for ti_data in results:
+                self._match_feeds(ti_data)
+        except Exception as e:
+            logger.error(f"Threat feed matching failed: {e}")
+        
+        total = len(domains)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for i, enrichment in enumerate(executor.map(self._safe_enrich, domains)):
+                if i % 100 == 0:
+                    logger.info("Processed %d/%d domains", i, total)
+                results[i].enrichment_data = enrichment
+        
+        # Geolocate all resolved IPs in batched requests
+        ips = [
+            r.enrichment_data['ip_address'] for r in results
+            if r.enrichment_data and r.enrichment_data.get('ip_address')
+        ]
+        if ips:
+            geo_by_ip = self._lookup_geo_batch(ips)
+            for r in results:
+                if r.enrichment_data and r.enrichment_data.get('ip_address') in geo_by_ip:
+                    r.enrichment_data.update(geo_by_ip[r.enrichment_data['ip_address']])
         
         logger.info(f"Completed threat intelligence check for {len(domains)} domains")
         return results
@@ -290,18 +583,17 @@ class ThreatIntelligenceGatherer:
         }
         
         try:
+            phishtank_data, openphish_data, urlhaus_data = self.fetch_all_feeds()
+            
             # PhishTank stats
-            phishtank_data = self.fetch_phishtank_data()
             stats['phishtank_count'] = len(phishtank_data)
             stats['cache_status']['phishtank'] = self._is_cache_valid(self.phishtank_cache)
             
             # OpenPhish stats
-            openphish_data = self.fetch_openphish_data()
             stats['openphish_count'] = len(openphish_data)
             stats['cache_status']['openphish'] = self._is_cache_valid(self.openphish_cache)
             
             # URLhaus stats
-            urlhaus_data = self.fetch_urlhaus_data()
             stats['urlhaus_count'] = len(urlhaus_data)
             stats['cache_status']['urlhaus'] = self._is_cache_valid(self.urlhaus_cache)
             
@@ -317,6 +609,44 @@ class ThreatIntelProcessor:
         self.db = db_session
         self.ti_gatherer = ThreatIntelligenceGatherer()
     
+    def build_ti_update(self, detection, ti_data: ThreatIntelData) -> Dict[str, Any]:
+        """Build the column updates for a detection from threat intelligence data"""
+        values = {
+            'id': detection.id,
+            'in_phishtank': ti_data.in_phishtank,
+            'in_openphish': ti_data.in_openphish,
+            'in_urlhaus': ti_data.in_urlhaus
+        }
+        
+        # Enrichment data
+        if ti_data.enrichment_data:
+            enrichment = ti_data.enrichment_data
+            values['ip_address'] = enrichment.get('ip_address')
+            values['country'] = enrichment.get('country')
+            values['hosting_isp'] = enrichment.get('isp')
+            values['asn'] = enrichment.get('asn')
+            
+            # DNS records
+            dns_records = enrichment.get('dns_records', {})
+            values['dns_records'] = json.dumps(dns_records)
+            values['ns_records'] = json.dumps(dns_records.get('NS', []))
+            values['mx_records'] = json.dumps(dns_records.get('MX', []))
+        
+        # Risk score based on threat intelligence
+        if ti_data.blacklist_hits > 0:
+            risk_score = min(100, detection.risk_score + (ti_data.blacklist_hits * 20))
+            values['risk_score'] = risk_score
+            if risk_score >= 80:
+                values['risk_level'] = "Critical"
+            elif risk_score >= 60:
+                values['risk_level'] = "High"
+            elif risk_score >= 40:
+                values['risk_level'] = "Medium"
+            else:
+                values['risk_level'] = "Low"
+        
+        return values
+    
     def update_detection_with_ti(self, detection_id: int, ti_data: ThreatIntelData):
         """Update detection record with threat intelligence data"""
         try:
@@ -330,36 +660,8 @@ class ThreatIntelProcessor:
                 logger.warning(f"Detection {detection_id} not found")
                 return False
             
-            # Update threat intelligence fields
-            detection.in_phishtank = ti_data.in_phishtank
-            detection.in_openphish = ti_data.in_openphish
-            detection.in_urlhaus = ti_data.in_urlhaus
-            
-            # Update enrichment data
-            if ti_data.enrichment_data:
-                enrichment = ti_data.enrichment_data
-                detection.ip_address = enrichment.get('ip_address')
-                detection.country = enrichment.get('country')
-                detection.hosting_isp = enrichment.get('isp')
-                detection.asn = enrichment.get('asn')
-                
-                # Store DNS records
-                dns_records = enrichment.get('dns_records', {})
-                detection.dns_records = json.dumps(dns_records)
-                detection.ns_records = json.dumps(dns_records.get('NS', []))
-                detection.mx_records = json.dumps(dns_records.get('MX', []))
-            
-            # Update risk score based on threat intelligence
-            if ti_data.blacklist_hits > 0:
-                detection.risk_score = min(100, detection.risk_score + (ti_data.blacklist_hits * 20))
-                if detection.risk_score >= 80:
-                    detection.risk_level = "Critical"
-                elif detection.risk_score >= 60:
-                    detection.risk_level = "High"
-                elif detection.risk_score >= 40:
-                    detection.risk_level = "Medium"
-                else:
-                    detection.risk_level = "Low"
+            for column, value in self.build_ti_update(detection, ti_data).items():
+                setattr(detection, column, value)
             
             self.db.commit()
             logger.info(f"Updated detection {detection_id} with threat intelligence")
@@ -388,14 +690,19 @@ class ThreatIntelProcessor:
             domains = [d.phishing_domain for d in detections]
             ti_results = self.ti_gatherer.batch_check_domains(domains)
             
-            updated_count = 0
-            for detection, ti_data in zip(detections, ti_results):
-                if self.update_detection_with_ti(detection.id, ti_data):
-                    updated_count += 1
+            # One bulk UPDATE and a single commit for the whole batch
+            mappings = [
+                self.build_ti_update(detection, ti_data)
+                for detection, ti_data in zip(detections, ti_results)
+            ]
+            self.db.bulk_update_mappings(PhishingDetection, mappings)
+            self.db.commit()
             
+            updated_count = len(mappings)
             logger.info(f"Processed {updated_count}/{len(detections)} detections")
             return updated_count
             
         except Exception as e:
             logger.error(f"Failed to process new detections: {e}")
+            self.db.rollback()
             return 0
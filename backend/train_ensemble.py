@@ -3,27 +3,80 @@ Training script for ensemble phishing detection models
 Uses malicious domain datasets for training
 """
 
+import os
+
+# Cap the BLAS thread pools before numpy/sklearn load them, so model fitting
+# does not oversubscribe the cores alongside joblib-parallel estimators
+_BLAS_THREADS = str(max(1, (os.cpu_count() or 2) // 2))
+os.environ.setdefault('MKL_NUM_THREADS', _BLAS_THREADS)
+os.environ.setdefault('OPENBLAS_NUM_THREADS', _BLAS_THREADS)
+
 import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Iterator, Optional
 from pathlib import Path
 import json
 from datetime import datetime
+from sqlalchemy import select, func, literal
+
+# Swap in the oneDAL-accelerated estimators before sklearn is first imported
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+    SKLEARNEX_AVAILABLE = True
+except ImportError:
+    SKLEARNEX_AVAILABLE = False
 
 from backend.database import SessionLocal
-from backend.models import PhishingDetection
+from backend.models import PhishingDetection, CSEDomain
 from backend.ensemble_detector import EnsemblePhishingDetector
+from backend.feature_cache import FeatureCache
+
+try:
+    from joblib import Parallel, delayed, cpu_count
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Resolved once rather than probing every row for the attribute
+HAS_CONTENT_COLUMN = 'content' in PhishingDetection.__table__.columns
+
+# Below this many samples the process pool start-up costs more than it saves
+PARALLEL_MIN_SAMPLES = 1000
+
+# Rows per chunk when streaming CSV datasets
+CSV_CHUNK_SIZE = 50_000
+
+# Dataset label values that mark a sample as phishing
+PHISHING_LABELS = frozenset({'phishing', 'malicious', '1', 'true'})
+
+FEATURE_CACHE_PATH = "./logs/feature_cache.sqlite"
+TRAIN_CACHE_PATH = "./logs/train_cache.npz"
+
+
+def _extract_chunk(detector: EnsemblePhishingDetector, domains: List[str], contents: List[str],
+                   legitimate_domains: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Extract the feature matrix and success mask for a chunk of samples"""
+    return detector._extract_advanced_features_batch(domains, contents, legitimate_domains)
+
 class EnsembleTrainer:
     """Train ensemble models using malicious domain datasets"""
     
-    def __init__(self):
+    def __init__(self, feature_cache_path: Optional[str] = FEATURE_CACHE_PATH):
         self.ensemble_detector = EnsemblePhishingDetector()
         self.training_data = []
-        self.feature_names = []
+        self.feature_names = list(EnsemblePhishingDetector.FEATURE_NAMES)
+        self.feature_cache_path = feature_cache_path
+        self._feature_cache = None
         
     def load_malicious_domains(self, dataset_path: str) -> List[Dict[str, Any]]:
         """Load malicious domains from dataset file"""
@@ -31,38 +84,15 @@ class EnsembleTrainer:
         
         try:
             if dataset_path.endswith('.csv'):
-                df = pd.read_csv(dataset_path)
-                
-                # Common column names for malicious domain datasets
-                domain_col = None
-                label_col = None
-                
-                for col in df.columns:
-                    col_lower = col.lower()
-                    if 'domain' in col_lower or 'url' in col_lower:
-                        domain_col = col
-                    elif 'label' in col_lower or 'class' in col_lower or 'type' in col_lower:
-                        label_col = col
-                
-                if domain_col is None:
-                    logger.error("No domain column found in dataset")
-                    return []
-                
-                for _, row in df.iterrows():
-                    domain = str(row[domain_col])
-                    label = 1 if label_col and str(row[label_col]).lower() in ['phishing', 'malicious', '1', 'true'] else 1
-                    
-                    malicious_domains.append({
-                        'domain': domain,
-                        'content': '',  # Will be filled during analysis
-                        'legitimate_domain': '',  # Will be generated
-                        'label': label,
-                        'source': 'dataset'
-                    })
+                for chunk in self.iter_malicious_domains(dataset_path):
+                    malicious_domains.extend(chunk)
                     
             elif dataset_path.endswith('.json'):
-                with open(dataset_path, 'r') as f:
-                    data = json.load(f)
+                if ORJSON_AVAILABLE:
+                    data = orjson.loads(Path(dataset_path).read_bytes())
+                else:
+                    with open(dataset_path, 'r') as f:
+                        data = json.load(f)
                 
                 for item in data:
                     malicious_domains.append({
@@ -80,6 +110,73 @@ class EnsembleTrainer:
             logger.error(f"Error loading malicious domains: {e}")
             return []
     
+    def iter_malicious_domains(self, dataset_path: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Stream a malicious CSV dataset, yielding one list of samples per chunk"""
+        # Sniff the header first so only the needed columns are parsed
+        columns = pd.read_csv(dataset_path, nrows=0).columns
+        domain_col, label_col = self._detect_dataset_columns(columns)
+        
+        if domain_col is None:
+            logger.error("No domain column found in dataset")
+            return
+        
+        usecols = [domain_col]
+        dtype = {domain_col: 'string'}
+        if label_col:
+            usecols.append(label_col)
+            dtype[label_col] = 'category'
+        
+        reader = pd.read_csv(dataset_path, usecols=usecols, dtype=dtype, chunksize=chunksize, engine='c')
+        for df in reader:
+            yield self._samples_from_frame(df, domain_col, label_col)
+    
+    def _detect_dataset_columns(self, columns) -> Tuple[Optional[str], Optional[str]]:
+        """Find the domain and label columns by their names"""
+        # Common column names for malicious domain datasets
+        domain_col = None
+        label_col = None
+        
+        for col in columns:
+            col_lower = col.lower()
+            if 'domain' in col_lower or 'url' in col_lower:
+                domain_col = col
+            elif 'label' in col_lower or 'class' in col_lower or 'type' in col_lower:
+                label_col = col
+        
+        return domain_col, label_col
+    
+    def _samples_from_frame(self, df: pd.DataFrame, domain_col: str, label_col: Optional[str]) -> List[Dict[str, Any]]:
+        """Build malicious samples from a dataset frame"""
+        # Drop missing and empty domains up front so extraction never sees them
+        df = df[df[domain_col].notna() & (df[domain_col].astype(str).str.strip() != '')]
+        domains = df[domain_col].astype(str).to_numpy()
+        if label_col:
+            # Classify each distinct label once, then gather by category code;
+            # the trailing 0 catches missing labels, whose code is -1
+            label_values = df[label_col]
+            if not isinstance(label_values.dtype, pd.CategoricalDtype):
+                label_values = label_values.astype('category')
+            categories = label_values.cat.categories
+            lookup = np.fromiter(
+                (str(category).lower() in PHISHING_LABELS for category in categories),
+                dtype=np.int8,
+                count=len(categories)
+            )
+            labels = np.append(lookup, np.int8(0))[label_values.cat.codes.to_numpy()]
+        else:
+            labels = np.ones(len(domains), dtype=np.int8)
+        
+        return [
+            {
+                'domain': domain,
+                'content': '',  # Will be filled during analysis
+                'legitimate_domain': '',  # Will be generated
+                'label': int(label),
+                'source': 'dataset'
+            }
+            for domain, label in zip(domains, labels)
+        ]
+    
     def load_legitimate_domains(self, dataset_path: str) -> List[Dict[str, Any]]:
         """Load legitimate domains from dataset file"""
         legitimate_domains = []
@@ -88,16 +185,19 @@ class EnsembleTrainer:
             if dataset_path.endswith('.csv'):
                 df = pd.read_csv(dataset_path)
                 
-                for _, row in df.iterrows():
-                    domain = str(row.iloc[0])  # Assume first column is domain
-                    
-                    legitimate_domains.append({
+                # Assume first column is domain; skip missing and empty ones
+                domains = df.iloc[:, 0].dropna().astype(str)
+                domains = domains[domains.str.strip() != ''].to_numpy()
+                legitimate_domains = [
+                    {
                         'domain': domain,
                         'content': '',
                         'legitimate_domain': domain,
                         'label': 0,
                         'source': 'dataset'
-                    })
+                    }
+                    for domain in domains
+                ]
                     
             logger.info(f"Loaded {len(legitimate_domains)} legitimate domains from {dataset_path}")
             return legitimate_domains
@@ -108,72 +208,197 @@ class EnsembleTrainer:
     
     def generate_training_data(self, malicious_domains: List[Dict], legitimate_domains: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
         """Generate training data with features"""
-        X = []
-        y = []
+        samples = malicious_domains + legitimate_domains
+        domains, contents, legitimate, labels = self._sample_columns(samples)
         
-        logger.info("Generating training features...")
+        logger.info(f"Generating training features for {len(samples)} domains...")
         
-        # Process malicious domains
-        for i, domain_data in enumerate(malicious_domains):
-            if i % 100 == 0:
-                logger.info(f"Processing malicious domain {i}/{len(malicious_domains)}")
-            
-            try:
-                # Extract features using ensemble detector
-                features = self.ensemble_detector._extract_advanced_features(
-                    domain_data['domain'],
-                    domain_data['content'],
-                    domain_data['legitimate_domain']
-                )
-                
-                if not self.feature_names:
-                    self.feature_names = list(features.keys())
-                
-                feature_vector = [features.get(name, 0.0) for name in self.feature_names]
-                X.append(feature_vector)
-                y.append(domain_data['label'])
-                
-            except Exception as e:
-                logger.warning(f"Error processing domain {domain_data['domain']}: {e}")
-                continue
+        X, valid = self._extract_features_deduplicated(domains, contents, legitimate)
+        X = X[valid]
+        y = labels[valid]
         
-        # Process legitimate domains
-        for i, domain_data in enumerate(legitimate_domains):
-            if i % 100 == 0:
-                logger.info(f"Processing legitimate domain {i}/{len(legitimate_domains)}")
-            
+        logger.info(f"Generated training data: {X.shape[0]} samples, {X.shape[1]} features")
+        self._log_class_distribution(y)
+        
+        return X, y
+    
+    def generate_training_data_from_csv(self, dataset_path: str, legitimate_domains: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate training data from a malicious CSV dataset without loading it
+        whole; chunks are handed to the workers as they are read
+        """
+        labels = []
+        
+        def sample_batches():
+            yield from self.iter_malicious_domains(dataset_path)
+            if legitimate_domains:
+                yield legitimate_domains
+        
+        def columns_of_batches():
+            for samples in sample_batches():
+                domains, contents, legitimate, batch_labels = self._sample_columns(samples)
+                labels.append(batch_labels)
+                yield domains, contents, legitimate
+        
+        logger.info(f"Generating training features from {dataset_path}...")
+        
+        if JOBLIB_AVAILABLE:
+            # Parallel pulls from the generator lazily, so the next chunk is
+            # parsed while the workers extract features from earlier ones
+            results = Parallel(n_jobs=-1, backend='loky', pre_dispatch='2*n_jobs')(
+                delayed(_extract_chunk)(self.ensemble_detector, *columns)
+                for columns in columns_of_batches()
+            )
+        else:
+            results = [
+                _extract_chunk(self.ensemble_detector, *columns)
+                for columns in columns_of_batches()
+            ]
+        
+        if not results:
+            return np.empty((0, len(self.feature_names)), dtype=np.float32), np.empty(0, dtype=np.int8)
+        
+        valid = np.concatenate([chunk_valid for _, chunk_valid in results])
+        X = np.concatenate([chunk_X for chunk_X, _ in results])[valid]
+        y = np.concatenate(labels)[valid]
+        
+        logger.info(f"Generated training data: {X.shape[0]} samples, {X.shape[1]} features")
+        self._log_class_distribution(y)
+        
+        return X, y
+    
+    def _log_class_distribution(self, y: np.ndarray):
+        """Log how many samples each label has"""
+        classes, counts = np.unique(y, return_counts=True)
+        logger.info(f"Class distribution: {dict(zip(classes.tolist(), counts.tolist()))}")
+    
+    def _sample_columns(self, samples: List[Dict]) -> Tuple[List[str], List[str], List[str], np.ndarray]:
+        """Split sample dicts into the column lists the batch extractor takes"""
+        domains = [sample['domain'] for sample in samples]
+        contents = [sample['content'] for sample in samples]
+        legitimate = [sample['legitimate_domain'] for sample in samples]
+        labels = np.fromiter((sample['label'] for sample in samples), dtype=np.int8, count=len(samples))
+        return domains, contents, legitimate, labels
+    
+    def _extract_features_deduplicated(self, domains: List[str], contents: List[str],
+                                       legitimate_domains: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract features once per distinct sample and expand back to every row"""
+        frame = pd.DataFrame({
+            'domain': domains,
+            'content': contents,
+            'legitimate_domain': legitimate_domains
+        }).fillna('')
+        
+        # With sort=False group ids follow first appearance, which is also
+        # the order drop_duplicates keeps
+        group = frame.groupby(list(frame.columns), sort=False).ngroup().to_numpy()
+        unique = frame.drop_duplicates()
+        
+        if len(frame):
+            logger.info(
+                f"Deduplicated {len(frame)} samples to {len(unique)} "
+                f"({1 - len(unique) / len(frame):.1%} duplicates)"
+            )
+        
+        X_unique, valid_unique = self._extract_features_cached(
+            unique['domain'].tolist(),
+            unique['content'].tolist(),
+            unique['legitimate_domain'].tolist()
+        )
+        return X_unique[group], valid_unique[group]
+    
+    def _get_feature_cache(self) -> Optional[FeatureCache]:
+        """Open the feature cache on first use; None when caching is disabled"""
+        if self._feature_cache is None and self.feature_cache_path:
             try:
-                features = self.ensemble_detector._extract_advanced_features(
-                    domain_data['domain'],
-                    domain_data['content'],
-                    domain_data['legitimate_domain']
+                self._feature_cache = FeatureCache(
+                    self.feature_cache_path,
+                    self.feature_names,
+                    EnsemblePhishingDetector.FEATURE_EXTRACTOR_VERSION
                 )
-                
-                feature_vector = [features.get(name, 0.0) for name in self.feature_names]
-                X.append(feature_vector)
-                y.append(domain_data['label'])
-                
             except Exception as e:
-                logger.warning(f"Error processing domain {domain_data['domain']}: {e}")
-                continue
+                logger.warning(f"Feature cache unavailable: {e}")
+                self.feature_cache_path = None
+        return self._feature_cache
+    
+    def _extract_features_cached(self, domains: List[str], contents: List[str],
+                                 legitimate_domains: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract the feature matrix, reusing vectors cached by earlier runs"""
+        cache = self._get_feature_cache()
+        if cache is None:
+            return self._extract_features_parallel(domains, contents, legitimate_domains)
         
-        X = np.array(X)
-        y = np.array(y)
+        keys = [cache.key(d, c, l) for d, c, l in zip(domains, contents, legitimate_domains)]
+        cached = cache.get_many(keys)
         
-        logger.info(f"Generated training data: {X.shape[0]} samples, {X.shape[1]} features")
-        logger.info(f"Class distribution: {np.bincount(y)}")
+        X = np.empty((len(keys), len(self.feature_names)), dtype=np.float32)
+        valid = np.zeros(len(keys), dtype=bool)
+        misses = []
+        for i, key in enumerate(keys):
+            vec = cached.get(key)
+            if vec is None:
+                misses.append(i)
+            else:
+                X[i] = vec
+                valid[i] = True
         
-        return X, y
+        logger.info(f"Feature cache: {len(keys) - len(misses)} hits, {len(misses)} misses")
+        
+        if misses:
+            miss_X, miss_valid = self._extract_features_parallel(
+                [domains[i] for i in misses],
+                [contents[i] for i in misses],
+                [legitimate_domains[i] for i in misses]
+            )
+            miss_idx = np.array(misses)
+            X[miss_idx] = miss_X
+            valid[miss_idx] = miss_valid
+            cache.put_many([
+                (keys[i], miss_X[j]) for j, i in enumerate(misses) if miss_valid[j]
+            ])
+        
+        return X, valid
+    
+    def _extract_features_parallel(self, domains: List[str], contents: List[str],
+                                   legitimate_domains: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract the feature matrix for all samples, fanning out over worker processes"""
+        if not JOBLIB_AVAILABLE or len(domains) < PARALLEL_MIN_SAMPLES:
+            return _extract_chunk(self.ensemble_detector, domains, contents, legitimate_domains)
+        
+        # Extraction is pure Python with no BLAS calls, so it uses every core;
+        # anything BLAS-heavy run under Parallel should instead use
+        # n_jobs = cpu_count() // MKL_NUM_THREADS.
+        # A few chunks per worker keeps the pool balanced while the detector
+        # is only pickled once per chunk rather than once per sample
+        n_chunks = cpu_count() * 4
+        chunk_size = -(-len(domains) // n_chunks)
+        bounds = range(0, len(domains), chunk_size)
+        
+        chunk_results = Parallel(n_jobs=-1, backend='loky')(
+            delayed(_extract_chunk)(
+                self.ensemble_detector,
+                domains[i:i + chunk_size],
+                contents[i:i + chunk_size],
+                legitimate_domains[i:i + chunk_size]
+            )
+            for i in bounds
+        )
+        X = np.concatenate([chunk_X for chunk_X, _ in chunk_results])
+        valid = np.concatenate([chunk_valid for _, chunk_valid in chunk_results])
+        return X, valid
     
     def train_models(self, X: np.ndarray, y: np.ndarray, test_size: float = 0.2) -> Dict[str, Any]:
         """Train ensemble models"""
         try:
-            from sklearn.model_selection import train_test_split
+            from sklearn.model_selection import StratifiedShuffleSplit
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=test_size, random_state=42, stratify=y
-            )
+            # Split data by stratified indices so X is gathered exactly once
+            # per side
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            train_idx, test_idx = next(splitter.split(np.zeros(len(y)), y))
+            X_train, X_test = X[train_idx], X[test_idx]
+            y_train, y_test = y[train_idx], y[test_idx]
             
             logger.info(f"Training set: {X_train.shape[0]} samples")
             logger.info(f"Test set: {X_test.shape[0]} samples")
@@ -211,8 +436,15 @@ class EnsembleTrainer:
             performance_file = Path("./logs/ensemble_performance.json")
             performance_file.parent.mkdir(exist_ok=True)
             
-            with open(performance_file, 'w') as f:
-                json.dump(performance, f, indent=2, default=str)
+            if ORJSON_AVAILABLE:
+                performance_file.write_bytes(orjson.dumps(
+                    performance,
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                ))
+            else:
+                with open(performance_file, 'w') as f:
+                    json.dump(performance, f, indent=2, default=str)
             
             logger.info(f"Model performance saved to {performance_file}")
             
@@ -223,73 +455,126 @@ class EnsembleTrainer:
         """Train using existing database detections"""
         try:
             db = SessionLocal()
+            data = None
+            try:
+                # Reuse the previous run's arrays while the detections are unchanged
+                fingerprint = self._database_fingerprint(db)
+                data = self._load_training_cache(fingerprint)
+                if data is None:
+                    phishing_domains, phishing_contents, phishing_legitimate = self._fetch_database_samples(db)
+            finally:
+                db.close()
             
-            # Get phishing detections
-            phishing_detections = db.query(PhishingDetection).filter(
-                PhishingDetection.is_active == True
-            ).limit(1000).all()
-            
-            if len(phishing_detections) < 100:
-                logger.warning("Not enough detections in database for training")
-                return {'success': False, 'error': 'Insufficient training data'}
-            
-            # Prepare training data
-            X = []
-            y = []
-            
-            for detection in phishing_detections:
-                try:
-                    features = self.ensemble_detector._extract_advanced_features(
-                        detection.phishing_domain,
-                        getattr(detection, 'content', ''),
-                        getattr(detection, 'cse_domain', {}).get('domain', '') if hasattr(detection, 'cse_domain') else ''
-                    )
-                    
-                    if not self.feature_names:
-                        self.feature_names = list(features.keys())
-                    
-                    feature_vector = [features.get(name, 0.0) for name in self.feature_names]
-                    X.append(feature_vector)
-                    y.append(1)  # All are phishing
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing detection {detection.id}: {e}")
-                    continue
-            
-            # Add some legitimate domains (simulated)
-            legitimate_domains = [
-                'google.com', 'microsoft.com', 'apple.com', 'amazon.com',
-                'facebook.com', 'twitter.com', 'linkedin.com', 'github.com'
-            ]
-            
-            for domain in legitimate_domains:
-                try:
-                    features = self.ensemble_detector._extract_advanced_features(
-                        domain, '', domain
-                    )
-                    
-                    feature_vector = [features.get(name, 0.0) for name in self.feature_names]
-                    X.append(feature_vector)
-                    y.append(0)  # Legitimate
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing legitimate domain {domain}: {e}")
-                    continue
+            if data is None:
+                if len(phishing_domains) < 100:
+                    logger.warning("Not enough detections in database for training")
+                    return {'success': False, 'error': 'Insufficient training data'}
+                
+                data = self._build_database_training_data(phishing_domains, phishing_contents, phishing_legitimate)
+                self._save_training_cache(data[0], data[1], fingerprint)
             
-            X = np.array(X)
-            y = np.array(y)
+            X, y = data
             
             logger.info(f"Database training data: {X.shape[0]} samples, {X.shape[1]} features")
+            self._log_class_distribution(y)
             
             # Train models
             result = self.train_models(X, y)
             
-            db.close()
             return result
             
         except Exception as e:
             logger.error(f"Database training error: {e}")
             return {'success': False, 'error': str(e)}
+    
+    def _fetch_database_samples(self, db) -> Tuple[List[str], List[str], List[str]]:
+        """Read phishing domains, page content and CSE domains from active detections"""
+        # Select only the columns the extractor needs and stream the rows;
+        # detections without a content column contribute empty content
+        content_col = PhishingDetection.__table__.c.content if HAS_CONTENT_COLUMN else literal('')
+        stmt = select(
+            PhishingDetection.phishing_domain,
+            content_col,
+            CSEDomain.domain
+        ).outerjoin(
+            CSEDomain, PhishingDetection.cse_domain_id == CSEDomain.id
+        ).where(
+            PhishingDetection.is_active.is_(True)
+        ).limit(1000).execution_options(yield_per=200)
+        
+        phishing_domains = []
+        phishing_contents = []
+        phishing_legitimate = []
+        for phishing_domain, content, cse_domain in db.execute(stmt):
+            phishing_domains.append(phishing_domain)
+            phishing_contents.append(content or '')
+            phishing_legitimate.append(cse_domain or '')
+        
+        return phishing_domains, phishing_contents, phishing_legitimate
+    
+    def _build_database_training_data(self, phishing_domains: List[str], phishing_contents: List[str],
+                                      phishing_legitimate: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract features for database detections plus known legitimate domains"""
+        # Add some legitimate domains (simulated)
+        legitimate_domains = [
+            'google.com', 'microsoft.com', 'apple.com', 'amazon.com',
+            'facebook.com', 'twitter.com', 'linkedin.com', 'github.com'
+        ]
+        
+        # Both classes go through the same batched extractor
+        domains = phishing_domains + legitimate_domains
+        labels = np.zeros(len(domains), dtype=np.int8)
+        labels[:len(phishing_domains)] = 1  # All detections are phishing
+        
+        X, valid = self._extract_features_cached(
+            domains,
+            phishing_contents + [''] * len(legitimate_domains),
+            phishing_legitimate + legitimate_domains
+        )
+        
+        return X[valid], labels[valid]
+    
+    def _database_fingerprint(self, db) -> str:
+        """Summarize the active detections so cached training data can be validated"""
+        count, max_id, latest = db.execute(
+            select(
+                func.count(PhishingDetection.id),
+                func.max(PhishingDetection.id),
+                func.max(PhishingDetection.detected_at)
+            ).where(PhishingDetection.is_active.is_(True))
+        ).one()
+        return f"{count}:{max_id}:{latest}"
+    
+    def _load_training_cache(self, fingerprint: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Load cached training arrays if they match the database and feature layout"""
+        cache_file = Path(TRAIN_CACHE_PATH)
+        if not cache_file.exists():
+            return None
+        
+        try:
+            with np.load(cache_file) as data:
+                if str(data['fingerprint']) != fingerprint or data['names'].tolist() != self.feature_names:
+                    return None
+                logger.info(f"Loaded training data from {cache_file}")
+                return data['X'], data['y']
+        except Exception as e:
+            logger.warning(f"Could not read training cache: {e}")
+            return None
+    
+    def _save_training_cache(self, X: np.ndarray, y: np.ndarray, fingerprint: str):
+        """Persist training arrays for reuse by later runs"""
+        try:
+            cache_file = Path(TRAIN_CACHE_PATH)
+            cache_file.parent.mkdir(exist_ok=True)
+            np.savez_compressed(
+                cache_file,
+                X=X.astype(np.float32, copy=False),
+                y=y.astype(np.int8, copy=False),
+                names=np.array(self.feature_names),
+                fingerprint=np.array(fingerprint)
+            )
+        except Exception as e:
+            logger.warning(f"Could not save training cache: {e}")
 
 def main():
     """Main training function"""
@@ -1,11 +1,45 @@
 from celery import Celery
+from celery.signals import task_postrun
 from celery.schedules import crontab
-from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy import and_, update, func, any_, literal, String
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session, scoped_session
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import json
 import os
+import re
 import time
+import uuid
+
+import redis
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    from difflib import SequenceMatcher
+    RAPIDFUZZ_AVAILABLE = False
 
 from backend.config import settings
+
+# Celery monkey-patches sockets itself when started with -P gevent/eventlet,
+# but psycopg2 is a C extension and needs its own wait callback to yield.
+# Green pools are only for workers that consume monitor_io alone: the other
+# queues reach Playwright's sync API and thread pools, which need prefork
+if settings.CELERY_POOL in ('gevent', 'eventlet'):
+    try:
+        if settings.CELERY_POOL == 'gevent':
+            from psycogreen.gevent import patch_psycopg
+        else:
+            from psycogreen.eventlet import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        print(f"[WARN] psycogreen not installed - database calls will block the {settings.CELERY_POOL} pool")
+
 from backend.database import SessionLocal
 from backend.models import CSEDomain, PhishingDetection, DomainVariation, ScanHistory
 from backend.domain_generator import generate_variations_for_domain
@@ -23,6 +57,19 @@ from backend.logging_config import (
 )
 
 
+# Subdomains of a CSE domain that are never flagged
+LEGIT_SUBDOMAINS = frozenset({'www', 'mail', 'ftp', 'blog', 'shop', 'store', 'app', 'api', 'admin'})
+
+
+@lru_cache(maxsize=1024)
+def _legit_set_for(cse_domain: str) -> frozenset:
+    """All FQDNs treated as the CSE domain itself"""
+    base = cse_domain.removeprefix('www.')
+    return frozenset(
+        {base, f'www.{base}'} | {f'{subdomain}.{cse_domain}' for subdomain in LEGIT_SUBDOMAINS}
+    )
+
+
 def is_legitimate_domain(suspicious_domain: str, cse_domain: str) -> bool:
     """
     Check if a suspicious domain is actually legitimate to prevent false positives.
@@ -34,30 +81,175 @@ def is_legitimate_domain(suspicious_domain: str, cse_domain: str) -> bool:
     Returns:
         True if the domain should be whitelisted, False otherwise
     """
-    # Remove www. prefix for comparison
-    suspicious_clean = suspicious_domain.replace('www.', '')
-    cse_clean = cse_domain.replace('www.', '')
-    
-    # If they're the same domain (ignoring www), it's legitimate
-    if suspicious_clean == cse_clean:
-        return True
+    # The same domain ignoring a leading www., or a common legitimate
+    # subdomain of the CSE domain
+    return suspicious_domain.lower() in _legit_set_for(cse_domain.lower())
+
+
+from backend.long_term_monitor import LongTermMonitor
+from backend.models import MonitoringSchedule
+
+# Bound parameters per IN (...) lookup, and rows per multi-row INSERT, of
+# generated variations
+VARIATION_LOOKUP_BATCH = 5000
+
+# Variations resolved per bulk DNS registration check; also the page size
+# when streaming a CSE domain's variations
+REGISTRATION_CHECK_BATCH = 500
+
+# Variations checked per CSE domain in one scan cycle
+MAX_VARIATIONS_PER_CYCLE = 50000
+
+
+def _iter_variation_pages(db: Session, cse_domain_id: int, limit: int, page_size: int = REGISTRATION_CHECK_BATCH):
+    """
+    Yield (id, variation, variation_type, is_registered) rows of a CSE domain
+    in id order, one page at a time. Pages are keyed on the primary key rather
+    than a server-side cursor, so commits between pages are safe.
+    """
+    last_id = 0
+    remaining = limit
+    while remaining > 0:
+        page = db.query(
+            DomainVariation.id,
+            DomainVariation.variation,
+            DomainVariation.variation_type,
+            DomainVariation.is_registered
+        ).filter(
+            DomainVariation.cse_domain_id == cse_domain_id,
+            DomainVariation.id > last_id
+        ).order_by(DomainVariation.id).limit(min(page_size, remaining)).all()
+        if not page:
+            return
+        yield page
+        last_id = page[-1].id
+        remaining -= len(page)
+
+
+def _store_new_variations(db: Session, cse_domain: CSEDomain) -> int:
+    """Generate look-alike variations for a CSE domain and insert the new ones"""
+    # Generate new variations (comprehensive - all TLDs + look-alikes)
+    variations = generate_variations_for_domain(cse_domain.domain, max_variations=100000)
     
-    # Check for common legitimate subdomains that shouldn't be flagged
-    legitimate_subdomains = ['www', 'mail', 'ftp', 'blog', 'shop', 'store', 'app', 'api', 'admin']
+    # Variation names are unique across all CSE domains; names another CSE
+    # domain already owns are skipped by ON CONFLICT instead of failing the run
+    rows = {}
+    for var in variations:
+        rows.setdefault(var['domain'], {
+            'cse_domain_id': cse_domain.id,
+            'variation': var['domain'],
+            'variation_type': var['type'],
+            'is_registered': False
+        })
+    rows = list(rows.values())
     
-    # Extract subdomain and main domain
-    parts = suspicious_domain.split('.')
-    if len(parts) >= 3:
-        subdomain = parts[0]
-        main_domain = '.'.join(parts[1:])
-        
-        # If it's a legitimate subdomain of the CSE domain
-        if subdomain in legitimate_subdomains and main_domain == cse_domain:
-            return True
+    added = 0
+    for i in range(0, len(rows), VARIATION_LOOKUP_BATCH):
+        stmt = pg_insert(DomainVariation).values(rows[i:i + VARIATION_LOOKUP_BATCH]).on_conflict_do_nothing(
+            index_elements=['variation']
+        )
+        added += db.execute(stmt).rowcount
     
-    return False
-from backend.long_term_monitor import LongTermMonitor
-from backend.models import MonitoringSchedule
+    cse_domain.variations_generated_at = datetime.utcnow()
+    db.commit()
+    return added
+
+
+# Analysis helpers are built lazily, once per worker process (after the
+# prefork fork), and shared by every task in that process and by the threads
+# of analyze_and_store_phishing's executor. They do hold shared state: the
+# detector's screenshot cache and the gatherer's TTL caches, both guarded by
+# locks. Any state added to these classes must stay thread-safe
+@lru_cache(maxsize=1)
+def _get_gatherer() -> IntelligenceGatherer:
+    return IntelligenceGatherer()
+
+
+@lru_cache(maxsize=1)
+def _get_detector() -> PhishingDetector:
+    return PhishingDetector()
+
+
+@lru_cache(maxsize=1)
+def _get_scorer() -> RiskScorer:
+    return RiskScorer()
+
+
+@lru_cache(maxsize=1)
+def _get_monitor() -> LongTermMonitor:
+    return LongTermMonitor()
+
+
+# Redis pub/sub channel for new-detection notifications; workers run in
+# separate processes from the API, so they publish instead of broadcasting
+DETECTIONS_CHANNEL = 'detections'
+
+# Redis key held while a continuous scan runs, so overlapping runs are skipped
+CONTINUOUS_SCAN_LOCK = 'lock:continuous_scan'
+
+
+@lru_cache(maxsize=1)
+def _get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+# Held while a CSE domain's variation generation is queued or running; a run
+# takes up to ~30 minutes, and a failed run is retried once the key expires
+GENERATE_VARIATIONS_LOCK = 'lock:generate_variations:{}'
+GENERATE_VARIATIONS_LOCK_TTL = 3600
+
+
+def enqueue_variation_generation(cse_domain_id: int) -> bool:
+    """Queue generate_variations_task unless one is already queued or running"""
+    try:
+        if not _get_redis().set(GENERATE_VARIATIONS_LOCK.format(cse_domain_id), 1,
+                                nx=True, ex=GENERATE_VARIATIONS_LOCK_TTL):
+            return False
+    except Exception as e:
+        print(f"[WARN] Variation generation lock unavailable: {e}")
+    generate_variations_task.delay(cse_domain_id)
+    return True
+
+
+@contextmanager
+def _keep_loaded_on_commit(db: Session):
+    """
+    Commit without expiring loaded objects, for rows whose values were all set
+    in Python (or assigned by the INSERT) and are read again right after
+    """
+    previous = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield
+    finally:
+        db.expire_on_commit = previous
+
+
+# Manual checks only run visual analysis against the CSE domains whose names
+# are closest to the checked domain
+CSE_PREFILTER_TOP_K = 3
+CSE_PREFILTER_MIN_SCORE = 40
+
+
+def _closest_cse_domains(domain: str, cse_domains: list) -> list:
+    """Top CSE domains by name similarity (0-100), dropping obviously unrelated ones"""
+    query = domain.lower().removeprefix('www.')
+    names = [cse.domain.lower().removeprefix('www.') for cse in cse_domains]
+    if RAPIDFUZZ_AVAILABLE:
+        scored = [(score, index) for _, score, index in process.extract(
+            query, names, scorer=fuzz.ratio, limit=CSE_PREFILTER_TOP_K
+        )]
+    else:
+        scored = sorted(
+            ((SequenceMatcher(None, query, name).ratio() * 100, index) for index, name in enumerate(names)),
+            reverse=True
+        )[:CSE_PREFILTER_TOP_K]
+    return [cse_domains[index] for score, index in scored if score >= CSE_PREFILTER_MIN_SCORE]
+
+
+# One session per worker thread (or green thread), reused across tasks and
+# reset after each one by task_postrun below
+WorkerSession = scoped_session(SessionLocal)
 
 # Initialize Celery
 celery_app = Celery(
@@ -75,7 +267,8 @@ celery_app.conf.update(
     # Worker configuration for stability
     worker_hijack_root_logger=False,
     worker_log_color=False,
-    worker_prefetch_multiplier=1,
+    worker_prefetch_multiplier=settings.CELERY_PREFETCH_MULTIPLIER,
+    worker_pool=settings.CELERY_POOL,
     task_acks_late=True,
     worker_max_tasks_per_child=50,
     worker_disable_rate_limits=True,
@@ -88,6 +281,22 @@ celery_app.conf.update(
     task_soft_time_limit=300,
     task_time_limit=600,
     task_ignore_result=True,
+    # Stored results are read by the API right away, so keep them briefly
+    result_expires=60,
+    # Long scans get their own queue so they cannot hold up interactive checks
+    task_routes={
+        'backend.worker.continuous_scan': {'queue': 'scans'},
+        'backend.worker.generate_variations_task': {'queue': 'scans'},
+        'backend.worker.long_term_monitoring_cycle': {'queue': 'scans'},
+        'backend.worker.check_single_domain': {'queue': 'interactive'},
+        'backend.worker.update_blacklist_feeds': {'queue': 'maintenance'},
+        'backend.worker.cleanup_expired_monitoring': {'queue': 'maintenance'},
+        # Pure DB round-trips; served by a green-thread (eventlet) worker
+        'backend.worker.create_monitoring_schedule': {'queue': 'monitor_io'},
+        'backend.worker.create_monitoring_schedules_bulk': {'queue': 'monitor_io'},
+        'backend.worker.get_monitoring_statistics': {'queue': 'monitor_io'},
+        'backend.worker.filter_unmonitored': {'queue': 'monitor_io'},
+    },
     # Error handling
     task_annotations={
         '*': {'rate_limit': '10/s'},
@@ -99,7 +308,7 @@ celery_app.conf.update(
 celery_app.conf.beat_schedule = {
     'scan-for-phishing-every-15-minutes': {
         'task': 'backend.worker.continuous_scan',
-        'schedule': crontab(minute=f'*/{settings.SCAN_INTERVAL_MINUTES}'),
+        'schedule': timedelta(minutes=settings.SCAN_INTERVAL_MINUTES),
     },
     'update-blacklist-feeds-hourly': {
         'task': 'backend.worker.update_blacklist_feeds',
@@ -116,10 +325,23 @@ celery_app.conf.beat_schedule = {
 }
 
 
+@task_postrun.connect
+def _reset_worker_session(**kwargs):
+    """Roll back anything left open and return the connection to the pool"""
+    WorkerSession.remove()
+
+
 @celery_app.task(name='backend.worker.continuous_scan')
 def continuous_scan():
     """Continuous scanning task - runs periodically"""
-    db = SessionLocal()
+    # Single-flight guard; the lock outlives the task's hard time limit at most
+    redis_client = _get_redis()
+    lock_token = uuid.uuid4().hex
+    if not redis_client.set(CONTINUOUS_SCAN_LOCK, lock_token, nx=True, ex=celery_app.conf.task_time_limit):
+        log_info("Skipping continuous scan - previous scan still running")
+        return {'status': 'skipped'}
+    
+    db = WorkerSession()
     scan_start_time = time.time()
     
     try:
@@ -148,94 +370,103 @@ def continuous_scan():
             
             try:
                 # Generate or get existing variations
-                existing_variations = db.query(DomainVariation).filter(
+                existing_count = db.query(func.count(DomainVariation.id)).filter(
                     DomainVariation.cse_domain_id == cse_domain.id
-                ).all()
+                ).scalar()
                 
                 # Log CSE domain scan start
                 log_cse_domain_scan_start(cse_domain.domain, cse_domain.organization_name)
-                print(f"[DEBUG] Starting scan for {cse_domain.domain} - Found {len(existing_variations)} existing variations")
+                print(f"[DEBUG] Starting scan for {cse_domain.domain} - Found {existing_count} existing variations")
                 
-                if not existing_variations or len(existing_variations) < 1000:
-                    # Generate new variations (comprehensive - all TLDs + look-alikes)
-                    variations = generate_variations_for_domain(cse_domain.domain, max_variations=100000)
-                    
-                    for var in variations:
-                        # Check if variation already exists
-                        exists = db.query(DomainVariation).filter(
-                            DomainVariation.variation == var['domain']
-                        ).first()
-                        
-                        if not exists:
-                            new_var = DomainVariation(
-                                cse_domain_id=cse_domain.id,
-                                variation=var['domain'],
-                                variation_type=var['type'],
-                                is_registered=False
-                            )
-                            db.add(new_var)
-                    
-                    db.commit()
-                    existing_variations = db.query(DomainVariation).filter(
-                        DomainVariation.cse_domain_id == cse_domain.id
-                    ).all()
+                if cse_domain.variations_generated_at is None:
+                    # Generation is expensive, so it runs once in its own task
+                    # instead of inside the periodic scan
+                    enqueue_variation_generation(cse_domain.id)
+                if existing_count == 0:
+                    continue
                 
                 # Check variations for registration
-                gatherer = IntelligenceGatherer()
+                gatherer = _get_gatherer()
                 
                 # Check up to 50000 variations per scan cycle (rotates through all variations over multiple cycles)
-                variations_to_check = min(len(existing_variations), 50000)
-                for variation in existing_variations[:variations_to_check]:
-                    try:
-                        domains_checked += 1
-                        variations_in_this_domain += 1
-                        
-                        # Check if variation still exists in database
-                        if not db.query(DomainVariation).filter(DomainVariation.id == variation.id).first():
-                            print(f"[DEBUG] Variation {variation.variation} was deleted, skipping")
-                            continue
+                checked_ids = []
+                newly_registered_ids = []
+                for page in _iter_variation_pages(db, cse_domain.id, MAX_VARIATIONS_PER_CYCLE):
+                    # Resolve registration for the whole page concurrently
+                    registration = gatherer.are_domains_registered([v.variation for v in page])
+                    
+                    # Look up which newly registered names are already detected
+                    # (under any CSE domain) in one query for the page
+                    newly_registered = [
+                        v.variation for v in page
+                        if registration.get(v.variation) and not v.is_registered
+                    ]
+                    detected = set()
+                    if newly_registered:
+                        detected.update(
+                            d for (d,) in db.query(PhishingDetection.phishing_domain).filter(
+                                PhishingDetection.phishing_domain.in_(newly_registered)
+                            )
+                        )
+                    for variation in page:
+                        try:
+                            domains_checked += 1
+                            variations_in_this_domain += 1
                         
-                        # Check if registered
-                        is_registered = gatherer.is_domain_registered(variation.variation)
+                            # Check if registered
+                            is_registered = registration.get(variation.variation, False)
                         
-                        # Debug logging for first few variations
-                        if variations_in_this_domain <= 5:
-                            print(f"[DEBUG] Checking {variation.variation} - Registered: {is_registered}")
+                            # Debug logging for first few variations
+                            if variations_in_this_domain <= 5:
+                                print(f"[DEBUG] Checking {variation.variation} - Registered: {is_registered}")
                         
-                        # Log variation check
-                        log_variation_check(variation.variation, variation.variation_type, is_registered)
-                    except Exception as e:
-                        print(f"[ERROR] Error processing variation {variation.variation}: {e}")
-                        continue
+                            # Log variation check
+                            log_variation_check(variation.variation, variation.variation_type, is_registered)
+                        except Exception as e:
+                            print(f"[ERROR] Error processing variation {variation.variation}: {e}")
+                            continue
                     
-                    if is_registered and not variation.is_registered:
-                        # Newly registered domain detected!
-                        print(f"[DEBUG] 🔴 NEW REGISTERED DOMAIN: {variation.variation} (Type: {variation.variation_type})")
-                        log_warning(f"🔴 NEW REGISTERED DOMAIN: {variation.variation} (Type: {variation.variation_type})")
-                        
-                        variation.is_registered = True
-                        variation.last_checked = datetime.utcnow()
+                        if is_registered and not variation.is_registered:
+                            # Newly registered domain detected!
+                            print(f"[DEBUG] 🔴 NEW REGISTERED DOMAIN: {variation.variation} (Type: {variation.variation_type})")
+                            log_warning(f"🔴 NEW REGISTERED DOMAIN: {variation.variation} (Type: {variation.variation_type})")
                         
-                        # Check if already detected
-                        existing_detection = db.query(PhishingDetection).filter(
-                            PhishingDetection.phishing_domain == variation.variation
-                        ).first()
+                            newly_registered_ids.append(variation.id)
                         
-                        if not existing_detection:
-                            # Analyze the domain
-                            result = analyze_and_store_phishing(
-                                db,
-                                cse_domain,
-                                variation.variation,
-                                variation.variation_type
-                            )
+                            # Check if already detected
+                            if variation.variation not in detected:
+                                # Analyze the domain
+                                result = analyze_and_store_phishing(
+                                    db,
+                                    cse_domain,
+                                    variation.variation,
+                                    variation.variation_type
+                                )
                             
-                            if result:
-                                phishing_found += 1
-                                detections_in_this_domain += 1
+                                if result:
+                                    detected.add(variation.variation)
+                                    phishing_found += 1
+                                    detections_in_this_domain += 1
                     
-                    variation.last_checked = datetime.utcnow()
+                        checked_ids.append(variation.id)
                 
+                # Apply the status changes as a few set-based UPDATEs instead of
+                # one per variation
+                checked_at = datetime.utcnow()
+                for i in range(0, len(checked_ids), VARIATION_LOOKUP_BATCH):
+                    db.execute(
+                        update(DomainVariation)
+                        .where(DomainVariation.id.in_(checked_ids[i:i + VARIATION_LOOKUP_BATCH]))
+                        .values(last_checked=checked_at)
+                        .execution_options(synchronize_session=False)
+                    )
+                for i in range(0, len(newly_registered_ids), VARIATION_LOOKUP_BATCH):
+                    db.execute(
+                        update(DomainVariation)
+                        .where(DomainVariation.id.in_(newly_registered_ids[i:i + VARIATION_LOOKUP_BATCH]))
+                        .values(is_registered=True)
+                        .execution_options(synchronize_session=False)
+                    )
                 db.commit()
                 
                 # Log CSE domain scan completion
@@ -260,11 +491,8 @@ def continuous_scan():
         scan_duration = time.time() - scan_start_time
         log_monitoring_cycle_end(scan.id, domains_checked, phishing_found, scan_duration)
         
-        # Add delay to prevent continuous scanning
-        remaining_time = (settings.SCAN_INTERVAL_MINUTES * 60) - scan_duration
-        if remaining_time > 0:
-            log_info(f"⏳ Waiting {remaining_time:.1f}s until next scan cycle...")
-            time.sleep(remaining_time)
+        # The next cycle is scheduled by Celery Beat; the scan lock keeps
+        # overlapping runs apart
         
         return {
             'status': 'completed',
@@ -281,7 +509,9 @@ def continuous_scan():
         log_error("Continuous scan", e)
         raise
     finally:
-        db.close()
+        # Release the lock only if it is still ours
+        if redis_client.get(CONTINUOUS_SCAN_LOCK) == lock_token.encode():
+            redis_client.delete(CONTINUOUS_SCAN_LOCK)
 
 
 def analyze_and_store_phishing(
@@ -304,27 +534,37 @@ def analyze_and_store_phishing(
         log_info(f"🔬 Analyzing suspicious domain: {suspicious_domain}")
         analysis_start = time.time()
         
+        gatherer = _get_gatherer()
+        detector = _get_detector()
+        
+        # Intelligence, Twitter scan and visual analysis are independent
+        # network-bound calls, so run them side by side
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            intel_future = executor.submit(gatherer.gather_all, suspicious_domain)
+            twitter_future = executor.submit(gatherer.scan_twitter_for_domain, suspicious_domain)
+            detection_future = executor.submit(detector.analyze_domain, cse_domain.domain, suspicious_domain)
+        
         # Gather intelligence with error handling
         try:
-            gatherer = IntelligenceGatherer()
-            intel = gatherer.gather_all(suspicious_domain)
+            intel = intel_future.result() or {}
         except Exception as e:
             print(f"[ERROR] Intelligence gathering failed for {suspicious_domain}: {e}")
             intel = {}
         
         # Scan Twitter for domain mentions with error handling
         try:
-            twitter_data = gatherer.scan_twitter_for_domain(suspicious_domain)
+            twitter_data = twitter_future.result() or {}
         except Exception as e:
             print(f"[ERROR] Twitter scan failed for {suspicious_domain}: {e}")
             twitter_data = {}
         
         # Detect phishing (screenshots + visual analysis) with error handling
         try:
-            detector = PhishingDetector()
-            detection_result = detector.analyze_domain(cse_domain.domain, suspicious_domain)
+            detection_result = detection_future.result()
         except Exception as e:
             print(f"[ERROR] Phishing detection failed for {suspicious_domain}: {e}")
+            detection_result = None
+        if not detection_result:
             detection_result = {
                 'visual_similarity_score': 0.0,
                 'content_similarity_score': 0.0,
@@ -334,7 +574,7 @@ def analyze_and_store_phishing(
         
         # Calculate risk score with error handling
         try:
-            scorer = RiskScorer()
+            scorer = _get_scorer()
             
             # Get domain age
             domain_age = gatherer.get_domain_age_days(intel.get('whois', {}))
@@ -354,7 +594,7 @@ def analyze_and_store_phishing(
             risk_result = {
                 'total_score': 0,
                 'risk_level': 'LOW',
-                'component_scores': {}
+                'components': {}
             }
         
         # Store ALL detections (even low risk) for visibility
@@ -378,6 +618,16 @@ def analyze_and_store_phishing(
                 except:
                     subnet_str = None
             
+            # Serialize the raw WHOIS/DNS payloads once, as JSON (smaller than
+            # their repr and parseable later); name_servers may be None or a string
+            name_server_list = whois_info.get('name_servers') or []
+            if isinstance(name_server_list, str):
+                name_server_list = [name_server_list]
+            name_servers = ','.join(str(ns) for ns in name_server_list)
+            registrant_json = json.dumps(whois_info, default=str) if whois_info else None
+            dns_records_json = json.dumps(dns_info, default=str)
+            ssl_issuer = ssl_info.get('issuer')
+            
             phishing_detection = PhishingDetection(
                 cse_domain_id=cse_domain.id,
                 phishing_domain=suspicious_domain,
@@ -387,7 +637,7 @@ def analyze_and_store_phishing(
                 # Domain info
                 domain_created_at=_parse_date(whois_info.get('creation_date')),
                 registrar=whois_info.get('registrar'),
-                registrant=str(whois_info) if whois_info else None,
+                registrant=registrant_json,
                 
                 # Network info
                 ip_address=ip_info.get('ip'),
@@ -400,7 +650,7 @@ def analyze_and_store_phishing(
                 ns_records=dns_info.get('ns_records'),
                 
                 # SSL
-                ssl_issuer=str(ssl_info.get('issuer')) if ssl_info.get('issuer') else None,
+                ssl_issuer=str(ssl_issuer) if ssl_issuer else None,
                 ssl_valid_from=_parse_date(ssl_info.get('not_before')),
                 ssl_valid_to=_parse_date(ssl_info.get('not_after')),
                 cert_transparency_logs=cert_trans.get('recent_certs', []) if cert_trans else None,
@@ -425,15 +675,16 @@ def analyze_and_store_phishing(
                 report_path=None,  # Will be generated later
                 
                 # Metadata
-                detection_metadata=risk_result,
+                # Score and level have their own columns; keep only the breakdown
+                detection_metadata=risk_result.get('components', {}),
                 
                 # PS-02 Additional Fields
                 registrant_organization=whois_info.get('org'),
                 registrant_country=whois_info.get('country'),
                 hosting_isp=ip_info.get('isp'),
                 hosting_country=ip_info.get('country'),
-                name_servers=','.join(whois_info.get('name_servers', [])),
-                dns_records_text=str(dns_info),
+                name_servers=name_servers,
+                dns_records_text=dns_records_json,
                 source_of_detection=variation_type,
                 detection_method=f"Visual Similarity: {detection_result.get('visual_similarity_score', 0):.1f}%",
                 social_media_post_date=twitter_data.get('latest_post_date') if twitter_data.get('found') else None,
@@ -442,14 +693,14 @@ def analyze_and_store_phishing(
             )
             
             db.add(phishing_detection)
-            db.commit()
-            db.refresh(phishing_detection)
+            with _keep_loaded_on_commit(db):
+                db.commit()
+            
+            # The domain is now known to be live; don't serve stale cached lookups
+            gatherer.invalidate(suspicious_domain)
             
             # Send real-time notification
             try:
-                from backend.main import manager
-                import asyncio
-                
                 # Create notification data
                 notification_data = {
                     "type": "new_detection",
@@ -465,8 +716,8 @@ def analyze_and_store_phishing(
                     }
                 }
                 
-                # Send notification asynchronously
-                asyncio.create_task(manager.broadcast(notification_data))
+                # Publish for any subscriber (e.g. the API's WebSocket fan-out)
+                _get_redis().publish(DETECTIONS_CHANNEL, json.dumps(notification_data))
                 
             except Exception as e:
                 print(f"[ERROR] Failed to send real-time notification: {e}")
@@ -517,7 +768,8 @@ def analyze_and_store_phishing(
                 
                 report_path = generate_phishing_report(report_data)
                 phishing_detection.report_path = report_path
-                db.commit()
+                with _keep_loaded_on_commit(db):
+                    db.commit()
                 
                 log_info(f"📄 Generated PDF report: {report_path}")
                 
@@ -539,32 +791,77 @@ def analyze_and_store_phishing(
         return False
 
 
+# OpenSSL-style dates, e.g. 'Jan  2 03:04:05 2024 GMT'
+_MONTH_NAME_DATE_RE = re.compile(
+    r'^([A-Za-z]{3}) +(\d{1,2}) (\d{1,2}):(\d{2}):(\d{2}) (\d{4})(?: [A-Z]{2,5})?$'
+)
+_MONTHS = {name: number for number, name in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1
+)}
+
+
 def _parse_date(date_str):
     """Parse date string to datetime"""
     if not date_str:
         return None
     
+    if isinstance(date_str, datetime):
+        return date_str
+    
+    if not isinstance(date_str, str):
+        return None
+    
+    value = date_str.split('.')[0].strip()
+    
+    # ISO 8601 covers the 'YYYY-MM-DD[ HH:MM:SS]' forms WHOIS returns
     try:
-        if isinstance(date_str, datetime):
-            return date_str
-        
-        if isinstance(date_str, str):
-            # Try common formats
-            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%b %d %H:%M:%S %Y %Z']:
-                try:
-                    return datetime.strptime(date_str.split('.')[0], fmt)
-                except:
-                    continue
-    except:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except ValueError:
         pass
     
+    match = _MONTH_NAME_DATE_RE.match(value)
+    if match:
+        month = _MONTHS.get(match.group(1).title())
+        if month:
+            day, hour, minute, second, year = (int(g) for g in match.groups()[1:])
+            try:
+                return datetime(year, month, day, hour, minute, second)
+            except ValueError:
+                return None
+    
     return None
 
 
+# Generating and inserting up to 100k variations outlasts the default limits
+@celery_app.task(name='backend.worker.generate_variations_task', soft_time_limit=1800, time_limit=2100)
+def generate_variations_task(cse_domain_id: int):
+    """Generate and store variations for a CSE domain once"""
+    db = WorkerSession()
+    try:
+        cse_domain = db.query(CSEDomain).filter(CSEDomain.id == cse_domain_id).first()
+        if not cse_domain:
+            return {'status': 'not_found', 'cse_domain_id': cse_domain_id}
+        if cse_domain.variations_generated_at is not None:
+            return {'status': 'already_generated', 'cse_domain_id': cse_domain_id}
+        
+        start = time.time()
+        added = _store_new_variations(db, cse_domain)
+        log_performance(f"Generate variations {cse_domain.domain}", time.time() - start,
+                        f"{added} new variations")
+        return {'status': 'completed', 'cse_domain_id': cse_domain_id, 'variations_added': added}
+    except Exception as e:
+        db.rollback()
+        log_error(f"Generating variations for CSE domain {cse_domain_id}", e)
+        return {'status': 'failed', 'error': str(e)}
+
+
 @celery_app.task(name='backend.worker.check_single_domain')
 def check_single_domain(domain: str):
     """Check a single domain manually"""
-    db = SessionLocal()
+    db = WorkerSession()
     
     try:
         print(f"[MANUAL CHECK] Checking {domain}")
@@ -573,19 +870,27 @@ def check_single_domain(domain: str):
         # For manual checks, we'll compare against all CSE domains
         cse_domains = db.query(CSEDomain).filter(CSEDomain.is_active == True).all()
         
-        gatherer = IntelligenceGatherer()
+        gatherer = _get_gatherer()
         
         # Quick check if domain is registered
         if not gatherer.is_domain_registered(domain):
             return {'status': 'not_registered', 'domain': domain}
         
-        # Analyze against each CSE domain to find best match
+        # Analyze against the closest CSE domains to find best match
+        candidates = _closest_cse_domains(domain, cse_domains)
+        if not candidates:
+            return {'status': 'no_match', 'domain': domain}
+        
         best_match = None
         highest_similarity = 0
         
-        for cse_domain in cse_domains:
-            detector = PhishingDetector()
-            result = detector.analyze_domain(cse_domain.domain, domain)
+        # Render the checked domain fresh, once, and compare it against each
+        # candidate CSE domain; only the CSE screenshots are reused across checks
+        detector = _get_detector()
+        suspicious_screenshot = detector._capture_screenshot(domain)
+        
+        for cse_domain in candidates:
+            result = detector.analyze_domain(cse_domain.domain, domain, suspicious_screenshot)
             
             if result.get('visual_similarity_score', 0) > highest_similarity:
                 highest_similarity = result['visual_similarity_score']
@@ -605,15 +910,58 @@ def check_single_domain(domain: str):
     except Exception as e:
         print(f"[ERROR] Manual check failed: {e}")
         return {'status': 'error', 'domain': domain, 'error': str(e)}
-    finally:
-        db.close()
+
+
+# Bytes per read when streaming blacklist feeds to disk
+FEED_CHUNK_SIZE = 64 * 1024
+
+OPENPHISH_FEED_PATH = '/tmp/openphish_feed.txt'
+
+
+def _download_feed(url: str, path: str, name: str):
+    """
+    Stream a feed to disk, skipping the download when the server reports it
+    unchanged since the last fetch (ETag / Last-Modified kept in Redis)
+    """
+    import requests
+    
+    redis_client = _get_redis()
+    validators_key = f'feed:{url}'
+    headers = {}
+    if os.path.exists(path):
+        cached = redis_client.hgetall(validators_key)
+        if cached.get(b'etag'):
+            headers['If-None-Match'] = cached[b'etag'].decode()
+        if cached.get(b'last_modified'):
+            headers['If-Modified-Since'] = cached[b'last_modified'].decode()
+    
+    with requests.get(url, headers=headers, timeout=30, stream=True) as response:
+        if response.status_code == 304:
+            print(f"[UPDATE] {name} feed unchanged")
+            return
+        response.raise_for_status()
+        
+        # Write to a temp file and swap it in, so readers never see a partial feed
+        tmp_path = f'{path}.part'
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=FEED_CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['last_modified'] = response.headers['Last-Modified']
+        redis_client.delete(validators_key)
+        if validators:
+            redis_client.hset(validators_key, mapping=validators)
+    print(f"[UPDATE] {name} feed updated")
 
 
 @celery_app.task(name='backend.worker.update_blacklist_feeds')
 def update_blacklist_feeds():
     """Update local blacklist feeds from public sources"""
-    import requests
-    
     try:
         print("[UPDATE] Updating blacklist feeds...")
         
@@ -623,12 +971,7 @@ def update_blacklist_feeds():
         
         # Download OpenPhish feed
         try:
-            response = requests.get('https://openphish.com/feed.txt', timeout=30)
-            if response.status_code == 200:
-                # Save to file for later checking
-                with open('/tmp/openphish_feed.txt', 'w') as f:
-                    f.write(response.text)
-                print("[UPDATE] OpenPhish feed updated")
+            _download_feed('https://openphish.com/feed.txt', OPENPHISH_FEED_PATH, 'OpenPhish')
         except Exception as e:
             print(f"[ERROR] Failed to update OpenPhish: {e}")
         
@@ -642,7 +985,7 @@ def update_blacklist_feeds():
 @celery_app.task(name='backend.worker.long_term_monitoring_cycle')
 def long_term_monitoring_cycle():
     """Long-term monitoring cycle - monitors suspected domains for configurable duration"""
-    monitor = LongTermMonitor()
+    monitor = _get_monitor()
     start_time = time.time()
     
     try:
@@ -658,9 +1001,12 @@ def long_term_monitoring_cycle():
         domains_checked = 0
         changes_detected = 0
         
+        # Resolve every schedule's CSE domain up front in one query
+        cse_domains = monitor.get_cse_domains(schedule.cse_domain_id for schedule in schedules)
+        
         for schedule in schedules:
             try:
-                result = monitor.monitor_domain(schedule)
+                result = monitor.monitor_domain(schedule, cse_domains.get(schedule.cse_domain_id))
                 domains_checked += 1
                 
                 if result.get('status') == 'success' and result.get('changes_detected', 0) > 0:
@@ -688,11 +1034,12 @@ def long_term_monitoring_cycle():
 @celery_app.task(name='backend.worker.cleanup_expired_monitoring')
 def cleanup_expired_monitoring():
     """Clean up expired monitoring schedules"""
-    monitor = LongTermMonitor()
+    monitor = _get_monitor()
     
     try:
         log_info("Starting cleanup of expired monitoring schedules")
         monitor.cleanup_expired_monitoring()
+        _invalidate_monitoring_stats()
         return {'status': 'completed'}
         
     except Exception as e:
@@ -700,60 +1047,177 @@ def cleanup_expired_monitoring():
         return {'status': 'failed', 'error': str(e)}
 
 
-@celery_app.task(name='backend.worker.create_monitoring_schedule')
+# The API waits on this result; every other task keeps task_ignore_result
+@celery_app.task(name='backend.worker.create_monitoring_schedule', ignore_result=False)
 def create_monitoring_schedule(domain: str, cse_domain_id: int, duration_days: int = None, risk_level: str = "MEDIUM"):
     """Create a new monitoring schedule for a domain"""
-    monitor = LongTermMonitor()
-    db = SessionLocal()
+    monitor = _get_monitor()
+    db = WorkerSession()
     
     try:
-        # Check if domain is already being monitored
-        existing = db.query(MonitoringSchedule).filter(
-            and_(
-                MonitoringSchedule.domain == domain,
-                MonitoringSchedule.is_active == True
-            )
-        ).first()
+        # One statement decides created vs already monitored, atomically,
+        # against the partial unique index on active schedules
+        values = monitor.build_schedule_values(domain, cse_domain_id, duration_days, risk_level)
+        stmt = pg_insert(MonitoringSchedule).values(**values).on_conflict_do_nothing(
+            index_elements=['domain'],
+            index_where=MonitoringSchedule.is_active == True
+        ).returning(MonitoringSchedule.id)
+        schedule_id = db.execute(stmt).scalar()
+        db.commit()
         
-        if existing:
+        if schedule_id is None:
             return {'status': 'already_monitored', 'domain': domain}
         
-        # Create new monitoring schedule
-        schedule = monitor.create_monitoring_schedule(domain, cse_domain_id, duration_days, risk_level)
-        db.add(schedule)
-        db.commit()
+        _invalidate_monitoring_stats()
         
-        log_info(f"Created monitoring schedule for {domain} (duration: {duration_days or 90} days, risk: {risk_level})")
+        log_info(
+            "Created monitoring schedule for %s (duration: %s days, risk: %s)",
+            domain, values['monitoring_duration_days'], risk_level,
+            extra={
+                'event': 'created_schedule',
+                'domain': domain,
+                'schedule_id': schedule_id,
+                'duration_days': values['monitoring_duration_days'],
+                'risk_level': risk_level
+            }
+        )
         
         return {
             'status': 'created',
             'domain': domain,
-            'schedule_id': schedule.id,
-            'duration_days': schedule.monitoring_duration_days,
-            'risk_level': schedule.risk_level
+            'schedule_id': schedule_id,
+            'duration_days': values['monitoring_duration_days'],
+            'risk_level': values['risk_level']
         }
         
     except Exception as e:
         log_error("create_monitoring_schedule", e, domain)
         return {'status': 'failed', 'error': str(e)}
-    finally:
-        db.close()
 
 
-@celery_app.task(name='backend.worker.get_monitoring_statistics')
-def get_monitoring_statistics():
-    """Get monitoring statistics"""
-    monitor = LongTermMonitor()
+def _actively_monitored(db: Session, domains: list) -> set:
+    """Domains from the list that already have an active monitoring schedule"""
+    if not domains:
+        return set()
+    # One array parameter (domain = ANY(:domains)) keeps this a single
+    # statement with a single bind, whatever the list length
+    return {
+        d for (d,) in db.query(MonitoringSchedule.domain).filter(
+            and_(
+                MonitoringSchedule.domain == any_(literal(list(set(domains)), ARRAY(String))),
+                MonitoringSchedule.is_active == True
+            )
+        )
+    }
+
+
+@celery_app.task(name='backend.worker.filter_unmonitored', ignore_result=False)
+def filter_unmonitored(domains: list) -> list:
+    """Return the domains that are not under active monitoring, in input order"""
+    with SessionLocal() as db:
+        monitored = _actively_monitored(db, domains)
+    return [d for d in dict.fromkeys(domains) if d not in monitored]
+
+
+# Schedules per create_monitoring_schedules_bulk message when the API fans out
+MONITORING_SCHEDULE_BATCH = 50
+
+
+@celery_app.task(name='backend.worker.create_monitoring_schedules_bulk')
+def create_monitoring_schedules_bulk(items: list):
+    """
+    Create monitoring schedules for many domains in one transaction.
+    items: [domain, cse_domain_id, duration_days, risk_level] entries
+    """
+    monitor = _get_monitor()
+    db = WorkerSession()
     
     try:
-        stats = monitor.get_monitoring_statistics()
-        return {'status': 'success', 'statistics': stats}
+        # Repeats in the batch collapse to their first entry
+        rows = []
+        seen = set()
+        for domain, cse_domain_id, duration_days, risk_level in items:
+            if domain in seen:
+                continue
+            seen.add(domain)
+            rows.append(monitor.build_schedule_values(domain, cse_domain_id, duration_days, risk_level))
+        
+        # Same conflict target as create_monitoring_schedule: domains already
+        # under active monitoring, including ones inserted concurrently by
+        # another batch, are skipped instead of failing the whole batch
+        created = []
+        if rows:
+            stmt = pg_insert(MonitoringSchedule).values(rows).on_conflict_do_nothing(
+                index_elements=['domain'],
+                index_where=MonitoringSchedule.is_active == True
+            ).returning(MonitoringSchedule.domain)
+            created = [d for (d,) in db.execute(stmt)]
+        db.commit()
+        if created:
+            _invalidate_monitoring_stats()
+        
+        created_set = set(created)
+        already_monitored = [row['domain'] for row in rows if row['domain'] not in created_set]
+        
+        log_info(
+            "Created %d monitoring schedules (%d already monitored)", len(created), len(already_monitored),
+            extra={'event': 'created_schedules_bulk', 'created': len(created), 'already_monitored': len(already_monitored)}
+        )
+        
+        return {
+            'status': 'created',
+            'created': created,
+            'already_monitored': sorted(already_monitored)
+        }
         
     except Exception as e:
-        log_error("get_monitoring_statistics", e)
+        db.rollback()
+        log_error("create_monitoring_schedules_bulk", e)
         return {'status': 'failed', 'error': str(e)}
 
 
+# Dashboards poll the monitoring statistics; serve them from Redis briefly
+MONITORING_STATS_CACHE_KEY = 'monitor:stats:v2'
+MONITORING_STATS_CACHE_TTL = 45
+
+
+def _invalidate_monitoring_stats():
+    """Drop cached monitoring statistics after schedules change"""
+    try:
+        _get_redis().delete(MONITORING_STATS_CACHE_KEY)
+    except Exception as e:
+        print(f"[WARN] Could not invalidate monitoring statistics cache: {e}")
+
+
+# Transient connection errors are retried with backoff; anything else
+# fails the task and surfaces through the API's result.get()
+@celery_app.task(
+    name='backend.worker.get_monitoring_statistics',
+    bind=True,
+    ignore_result=False,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3
+)
+def get_monitoring_statistics(self):
+    """Get monitoring statistics"""
+    try:
+        cached = _get_redis().get(MONITORING_STATS_CACHE_KEY)
+        if cached:
+            return {'status': 'success', 'statistics': json.loads(cached), 'cached': True}
+    except Exception as e:
+        print(f"[WARN] Monitoring statistics cache unavailable: {e}")
+    
+    with SessionLocal() as db:
+        stats = _get_monitor().get_monitoring_statistics(db)
+    
+    try:
+        _get_redis().setex(MONITORING_STATS_CACHE_KEY, MONITORING_STATS_CACHE_TTL, json.dumps(stats))
+    except Exception as e:
+        print(f"[WARN] Could not cache monitoring statistics: {e}")
+    return {'status': 'success', 'statistics': stats}
+
+
 if __name__ == '__main__':
     celery_app.start()
 